@@ -0,0 +1,148 @@
+"""Reports how importing, every relationship and mining scale with the size of a log.
+
+Usage::
+
+    python benchmarks/bench_scaling.py [--variants 100 1000 10000] [--labels 20 50]
+                                       [--length 10] [--repeat 3] [--output report.json]
+
+For every combination of the number of variants and activities, a synthetic
+log is generated (see `synthetic.generate_log`) and every operation is run
+`repeat` times. The wall time and CPU time of the best run, and the
+`tracemalloc` peak of one more run, are reported as JSON, one entry per log
+and operation.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from skelevision import LogSkeleton, TraceLog  # noqa: E402
+from synthetic import generate_log, write_txt, write_xes  # noqa: E402
+
+RELATIONS = (
+    "follows",
+    "never_together",
+    "equivalence",
+    "always_after",
+    "always_before",
+    "statistics",
+    "sum_counter",
+    "min_counter",
+    "max_counter",
+)
+
+
+def measure(func, repeat=3, setup=None):
+    """Runs func `repeat` times, calling setup before each run, and returns
+    the best wall and CPU times along with the peak traced memory.
+
+    Tracing slows down every allocation: the timed runs are not traced, the
+    peak is taken from a separate run.
+    """
+    wall = cpu = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        func()
+        wall = min(wall, time.perf_counter() - start_wall)
+        cpu = min(cpu, time.process_time() - start_cpu)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"wall_seconds": wall, "cpu_seconds": cpu, "peak_traced_bytes": peak}
+
+
+def bench_log(log, repeat=3):
+    """Returns the measurements of every operation on a log, keyed by operation."""
+    results = dict()
+    directory = tempfile.mkdtemp()
+    txt_path = os.path.join(directory, "log.txt")
+    xes_path = os.path.join(directory, "log.xes")
+    write_txt(log, txt_path)
+    write_xes(log, xes_path)
+
+    try:
+        results["from_txt"] = measure(lambda: TraceLog.from_txt(txt_path), repeat)
+        results["from_xes"] = measure(lambda: TraceLog.from_xes(xes_path), repeat)
+        results["from_txt"]["file_size"] = os.path.getsize(txt_path)
+        results["from_xes"]["file_size"] = os.path.getsize(xes_path)
+    finally:
+        os.remove(txt_path)
+        os.remove(xes_path)
+        os.rmdir(directory)
+
+    tl = log.augment()
+    for name in RELATIONS:
+        # Relationships are cached, time their computation
+        results[name] = measure(getattr(tl, name), repeat, setup=tl.clear_cache)
+    results["mine"] = measure(lambda: LogSkeleton.mine(tl, {}, {}), repeat, setup=tl.clear_cache)
+
+    return results
+
+
+def bench_scaling(variants=(100, 1000, 10000), labels=(20, 50), length=10,
+                  loop=0.1, parallel=0.2, repeat=3, seed=0):
+    """Benchmarks every combination of number of variants and activities and
+    returns the report as a dict.
+    """
+    runs = list()
+    for n_labels in labels:
+        for n_variants in variants:
+            log = generate_log(n_labels, n_variants, length, loop, parallel, seed)
+            runs.append({
+                "labels": n_labels,
+                "variants": len(log),
+                "traces": sum(log.values()),
+                "events": sum(len(t) * f for t, f in log.items()),
+                "operations": bench_log(log, repeat),
+            })
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "length": length,
+            "loop": loop,
+            "parallel": parallel,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--labels", type=int, nargs="+", default=[20, 50])
+    parser.add_argument("--length", type=int, default=10)
+    parser.add_argument("--loop", type=float, default=0.1)
+    parser.add_argument("--parallel", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="path of the JSON report, default stdout")
+    args = parser.parse_args()
+
+    report = bench_scaling(
+        args.variants, args.labels, args.length, args.loop, args.parallel, args.repeat, args.seed
+    )
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
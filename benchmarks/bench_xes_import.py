@@ -0,0 +1,53 @@
+"""Reports the time and peak memory of importing a XES log.
+
+Usage::
+
+    python benchmarks/bench_xes_import.py [path/to/log.xes.gz] [repeat]
+
+The imports are timed untraced; the Python allocations of one more import are
+traced with `tracemalloc`. The peak resident set size of the process (which
+also accounts for the libxml2 buffers) is reported too.
+"""
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from skelevision import TraceLog  # noqa: E402
+
+DEFAULT_LOG = os.path.join(os.path.dirname(HERE), "tests", "datasets", "L2.xes.gz")
+
+
+def bench_xes_import(filepath=DEFAULT_LOG, repeat=10):
+    """Imports the log `repeat` times and returns the measurements as a dict."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        tl = TraceLog.from_xes(filepath)
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows down every allocation, the peak is taken apart
+    tracemalloc.start()
+    TraceLog.from_xes(filepath)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "file": os.path.basename(filepath),
+        "file_size": os.path.getsize(filepath),
+        "variants": len(tl),
+        "repeat": repeat,
+        "seconds_per_import": elapsed / repeat,
+        "peak_traced_bytes": peak,
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+if __name__ == "__main__":
+    filepath = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(json.dumps(bench_xes_import(filepath, repeat), indent=2))
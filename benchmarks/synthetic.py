@@ -0,0 +1,121 @@
+"""Seeded generator of synthetic trace logs, for benchmarks.
+
+The traces are drawn from a random block structured process over the
+activities `a0`, `a1`, ...: every block is either a single activity, a
+parallel block (its activities occur in any order) or a loop (its activity
+is repeated). Each trace goes through a random, ordered, subset of the
+blocks, so that the number of distinct variants grows with the number of
+activities.
+"""
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from skelevision import TraceLog  # noqa: E402
+
+
+def _blocks(rng, labels, loop, parallel):
+    """Splits the labels into sequence, parallel and loop blocks."""
+    blocks = list()
+    i = 0
+    while i < len(labels):
+        r = rng.random()
+        if r < parallel and i + 1 < len(labels):
+            size = min(rng.randint(2, 4), len(labels) - i)
+            blocks.append(("par", labels[i:i + size]))
+            i += size
+        elif r < parallel + loop:
+            blocks.append(("loop", labels[i:i + 1]))
+            i += 1
+        else:
+            blocks.append(("seq", labels[i:i + 1]))
+            i += 1
+
+    return blocks
+
+
+def _trace(rng, blocks, length):
+    """Draws a single trace going through about `length` blocks."""
+    ratio = min(1.0, length / float(len(blocks)))
+    trace = list()
+    for kind, labels in blocks:
+        if rng.random() >= ratio:
+            continue
+        if kind == "par":
+            labels = list(labels)
+            rng.shuffle(labels)
+            trace.extend(labels)
+        elif kind == "loop":
+            repeat = 1
+            while rng.random() < 0.5:
+                repeat += 1
+            trace.extend(labels * repeat)
+        else:
+            trace.extend(labels)
+
+    return tuple(trace)
+
+
+def generate_log(n_labels=20, n_variants=100, length=10, loop=0.1, parallel=0.2, seed=0):
+    """Returns a synthetic TraceLog.
+
+    Parameters
+    ----------
+    n_labels: `int`
+        number of distinct activities
+    n_variants: `int`
+        number of distinct traces, fewer if the process cannot produce as many
+    length: `int`
+        average number of blocks a trace goes through
+    loop: `float`
+        probability of a block to be a loop
+    parallel: `float`
+        probability of a block to be a parallel block
+    seed: `int`
+        seed of the random generator, the same parameters give the same log
+
+    Returns
+    -------
+    `TraceLog`
+        the log, with Zipf distributed frequencies
+    """
+    rng = random.Random(seed)
+    labels = ["a{}".format(i) for i in range(n_labels)]
+    blocks = _blocks(rng, labels, loop, parallel)
+
+    tl = TraceLog()
+    attempts = 0
+    while len(tl) < n_variants and attempts < 20 * n_variants:
+        attempts += 1
+        trace = _trace(rng, blocks, length)
+        if len(trace) == 0 or trace in tl:
+            continue
+        tl[trace] = max(1, int(n_variants / (len(tl) + 1)))
+
+    return tl
+
+
+def write_txt(log, filepath):
+    """Writes a TraceLog in the `.txt` format read by `TraceLog.from_txt`."""
+    with open(filepath, "w") as f:
+        for i, (trace, freq) in enumerate(log.items()):
+            f.write("{} Case{} {}\n".format(freq, i, " ".join(trace)))
+
+
+def write_xes(log, filepath):
+    """Writes a TraceLog as a `.xes` file, with one trace element per case."""
+    case = 0
+    with open(filepath, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" ?>\n')
+        f.write('<log xes.version="1.0" xmlns="http://www.xes-standard.org/">\n')
+        for trace, freq in log.items():
+            events = "".join(
+                '<event><string key="concept:name" value="{}"/></event>'.format(a) for a in trace
+            )
+            for _ in range(freq):
+                f.write('<trace><string key="concept:name" value="Case{}"/>{}</trace>\n'.format(case, events))
+                case += 1
+        f.write("</log>\n")
@@ -1,4 +1,9 @@
+from .conformance import ConformanceChecker
+from .engine import RelationEngine
 from .exceptions import IllegalLogAction
-from .miners import LogSkeleton
-from .objects import TraceLog
+from .instrumentation import Instrumentation
+from .miners import IncrementalLogSkeleton, LogSkeleton, SampledLogSkeleton
+from .objects import TraceLog, register_importer
+from .streaming import EventStreamBuilder
+from .trie import VariantTrie
 from .utils import *
@@ -0,0 +1,224 @@
+from .utils import _iter_bits, _predecessor_masks, _successor_masks
+
+
+class ConformanceChecker(object):
+    """Checks traces against the constraints of a mined log skeleton.
+
+    The relationships of the skeleton are compiled into one bitmask row per
+    activity, so that every trace is checked with a few bitwise operations
+    per distinct activity, on its integer encoding. Every distinct trace is
+    only checked once, its violations are cached (up to `cache_size` traces).
+
+    A trace violates:
+
+    - `"equivalence"` (a, b) if a and b occur a different number of times in it,
+    - `"alwaysAfter"` (a, b) if b does not occur after the first occurrence
+      of a (which is not the last activity of the trace),
+    - `"alwaysBefore"` (a, b) if b does not occur before the last occurrence
+      of a (which is not the first activity of the trace),
+    - `"neverTogether"` (a, b) if both a and b occur in it,
+    - `"dependency"` (a, b) if b directly follows a in it, while it never does
+      in the mined log,
+    - `"count"` (a, None) if a occurs less or more times than the min and max
+      number of times it occurs in the traces of the mined log,
+    - `"unknown"` (a, None) if a does not occur in the mined log.
+
+    Parameters
+    ----------
+    skeleton: `dict`
+        mapping of the strings "relationships" and "statistics" to corresponding
+        dict of relationships and statistics, as returned by `LogSkeleton.mine`
+    cache_size: `int`
+        maximal number of distinct traces whose violations are cached
+    """
+
+    def __init__(self, skeleton, cache_size=100000):
+        relationships = skeleton["relationships"]
+        node = skeleton["statistics"]["node"]
+
+        names = set(node)
+        for pairs in relationships.values():
+            for pair in pairs:
+                names.update(pair)
+        names = sorted(names)
+        ids = {name: idx for idx, name in enumerate(names)}
+        self.activity_names = names
+        self.activity_ids = ids
+
+        def rows(pairs):
+            matrix = [0] * len(names)
+            for a, b in pairs:
+                matrix[ids[a]] |= 1 << ids[b]
+            return matrix
+
+        equivalence = rows(relationships.get("equivalence", ()))
+        never_together = rows(relationships.get("neverTogether", ()))
+        # Both relationships are symmetric: check every pair once, from its lowest id
+        for a in range(len(names)):
+            for b in _iter_bits(equivalence[a] | never_together[a]):
+                if (equivalence[a] >> b) & 1:
+                    equivalence[b] |= 1 << a
+                if (never_together[a] >> b) & 1:
+                    never_together[b] |= 1 << a
+        self.equivalence = [row & ~((2 << a) - 1) for a, row in enumerate(equivalence)]
+        # The partners with a lower id, to find from the present activities
+        # the equivalent ones missing from a trace
+        self._equivalence_below = [row & ((1 << a) - 1) for a, row in enumerate(equivalence)]
+        self.never_together = [row & ~((2 << a) - 1) for a, row in enumerate(never_together)]
+
+        self.always_after = rows(relationships.get("alwaysAfter", ()))
+        self.always_before = rows(relationships.get("alwaysBefore", ()))
+
+        dependency = relationships.get("dependency")
+        self.dependency = None if dependency is None else rows(dependency)
+
+        self.min = [node[name]["min"] if name in node else 0 for name in names]
+        self.max = [node[name]["max"] if name in node else None for name in names]
+        # Activities which have to occur in every trace
+        self.required = 0
+        for a, min_c in enumerate(self.min):
+            if min_c > 0:
+                self.required |= 1 << a
+
+        self.cache_size = cache_size
+        self._cache = dict()
+
+    @staticmethod
+    def from_file(filepath, cache_size=100000):
+        """Returns a checker for a log skeleton saved with `LogSkeleton.save`."""
+        from .miners import LogSkeleton
+
+        return ConformanceChecker(LogSkeleton.load(filepath), cache_size=cache_size)
+
+    def violations(self, trace):
+        """Returns the constraints of the skeleton a trace violates.
+
+        Parameters
+        ----------
+        trace: `tuple` of `str`
+            a trace as a tuple of activities
+
+        Returns
+        -------
+        `list` of `tuples`
+            the violated constraints, as (relationship, a, b) triples
+        """
+        trace = tuple(trace)
+        if trace in self._cache:
+            return list(self._cache[trace])
+
+        found = self._check(trace)
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[trace] = found
+
+        return list(found)
+
+    def _check(self, trace):
+        """Computes the violations of a trace, see `violations`."""
+        names = self.activity_names
+        ids = self.activity_ids
+        found = list()
+
+        # Encode the trace, reporting the unknown activities. They are kept in
+        # place, as an id no constraint refers to, not to make up adjacencies
+        unknown = len(names)
+        encoded = list()
+        for activity in trace:
+            idx = ids.get(activity)
+            if idx is None:
+                idx = unknown
+                if ("unknown", activity, None) not in found:
+                    found.append(("unknown", activity, None))
+            encoded.append(idx)
+
+        counts = dict()
+        present = 0
+        for a in encoded:
+            if a == unknown:
+                continue
+            if a in counts:
+                counts[a] += 1
+            else:
+                counts[a] = 1
+                present |= 1 << a
+
+        # Number of occurrences, activities which are missing first
+        if self.required & ~present:
+            for a in _iter_bits(self.required & ~present):
+                found.append(("count", names[a], None))
+
+        # Only the rows with some constraint left are walked bit by bit
+        min_c = self.min
+        max_c = self.max
+        equivalence = self.equivalence
+        equivalence_below = self._equivalence_below
+        never_together = self.never_together
+        for a, c in counts.items():
+            if c < min_c[a] or (max_c[a] is not None and c > max_c[a]):
+                found.append(("count", names[a], None))
+            if equivalence[a]:
+                for b in _iter_bits(equivalence[a]):
+                    if counts.get(b, 0) != c:
+                        found.append(("equivalence", names[a], names[b]))
+            # Equivalent activities, the lowest of which is missing from the trace
+            row = equivalence_below[a] & ~present
+            if row:
+                for b in _iter_bits(row):
+                    found.append(("equivalence", names[b], names[a]))
+            row = never_together[a] & present
+            if row:
+                for b in _iter_bits(row):
+                    found.append(("neverTogether", names[a], names[b]))
+
+        always_after = self.always_after
+        for a, mask in _successor_masks(encoded).items():
+            if a == unknown:
+                continue
+            row = always_after[a] & ~mask
+            if row:
+                for b in _iter_bits(row):
+                    found.append(("alwaysAfter", names[a], names[b]))
+        always_before = self.always_before
+        for a, mask in _predecessor_masks(encoded).items():
+            if a == unknown:
+                continue
+            row = always_before[a] & ~mask
+            if row:
+                for b in _iter_bits(row):
+                    found.append(("alwaysBefore", names[a], names[b]))
+
+        if self.dependency is not None:
+            reported = set()
+            for a, b in zip(encoded, encoded[1:]):
+                if a == unknown or b == unknown:
+                    continue
+                if not (self.dependency[a] >> b) & 1 and (a, b) not in reported:
+                    reported.add((a, b))
+                    found.append(("dependency", names[a], names[b]))
+
+        return found
+
+    def check(self, traces, details=True):
+        """Checks a batch of traces against the skeleton.
+
+        Parameters
+        ----------
+        traces: `TraceLog` or iterable
+            the traces, as tuples of activities
+        details: `bool`
+            If True, the violated constraints of every trace are returned,
+            otherwise only their number.
+
+        Returns
+        -------
+        `dict` or `list`
+            For a `TraceLog`, a mapping from each of its traces to its violations
+            (or their number), otherwise a list of them, in the order of the traces.
+        """
+        verdict = self.violations if details else (lambda t: len(self.violations(t)))
+
+        if hasattr(traces, "keys"):
+            return {trace: verdict(trace) for trace in traces.keys()}
+        return [verdict(trace) for trace in traces]
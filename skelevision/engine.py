@@ -0,0 +1,411 @@
+import itertools
+
+from .instrumentation import _stage
+from .utils import _iter_bits, _predecessor_masks, _successor_masks
+
+
+def _candidate_pairs(candidates, names, excluded_a=None, excluded_b=None, labels_mask=None):
+    """Returns the pairs of activities (a, b) for which b is in the candidate
+    bitmask of a, a `None` bitmask standing for every activity.
+
+    Parameters
+    ----------
+    candidates: `list`
+        per activity id, the bitmask of candidate activity ids
+    names: `list` of `str`
+        the activity labels, indexed by their integer id
+    excluded_a: `str`
+        label which is never the first activity of a pair
+    excluded_b: `str`
+        label which is never the second activity of a pair
+    labels_mask: `int`
+        bitmask of the activity ids to consider, default None thus all of them
+    """
+    labels = (1 << len(names)) - 1
+    if labels_mask is not None:
+        labels &= labels_mask
+    full = labels
+    ids = {name: idx for idx, name in enumerate(names)}
+    excluded_a = ids.get(excluded_a)
+    excluded_b = ids.get(excluded_b)
+
+    if excluded_b is not None:
+        full &= ~(1 << excluded_b)
+
+    pairs = set()
+    for a, mask in enumerate(candidates):
+        if a == excluded_a or not (labels >> a) & 1:
+            continue
+        mask = full if mask is None else mask & full
+        for b in _iter_bits(mask & ~(1 << a)):
+            pairs.add((names[a], names[b]))
+
+    return pairs
+
+
+def _class_pairs(classes, names):
+    """Returns the pairs of distinct activities (in both orientations) which
+    belong to the same equivalence class, ignoring class 0.
+
+    Parameters
+    ----------
+    classes: `list` of `int`
+        per activity id, its equivalence class
+    names: `list` of `str`
+        the activity labels, indexed by their integer id
+    """
+    groups = dict()
+    for a, cls in enumerate(classes):
+        if cls != 0:
+            groups.setdefault(cls, []).append(names[a])
+
+    pairs = set()
+    for members in groups.values():
+        if len(members) > 1:
+            pairs.update(itertools.permutations(members, r=2))
+
+    return pairs
+
+
+class RelationEngine(object):
+    """Builds every Log Skeleton relationship and statistic in a single pass
+    over the (integer encoded) variants of a trace log.
+
+    Each variant is reduced to a small summary (activity counts, first and
+    last occurrences, directly-follows pairs) which is folded into state
+    shared by all the relationships, so that the log is never scanned twice.
+    Only the activities occurring in the folded variants are part of the
+    relationships and statistics.
+
+    Parameters
+    ----------
+    activity_names: `list` of `str`
+        the activity labels, indexed by their integer id
+        (see `TraceLog.activity_names`)
+    start: `str`
+        label of the artificial start activity
+    end: `str`
+        label of the artificial end activity
+    """
+
+    def __init__(self, activity_names, start="[>", end="[]"):
+        self.activity_names = activity_names
+        self.start = start
+        self.end = end
+        self.n_variants = 0
+        # Bitmask of the activities occurring in any of the variants
+        self.present = 0
+
+        # Per activity: bitmask of the activities it occurred together with
+        self.together = []
+        # Per activity: bitmask of the candidate always-after/before
+        # activities, `None` while the activity is still unconstrained
+        self.after = []
+        self.before = []
+        # Per activity: equivalence class, refined by the count of the
+        # activity in every variant. Class 0 holds the activities absent
+        # from all variants seen so far.
+        self.classes = []
+        self._next_class = 1
+        # Per activity: sum, min (over the variants it occurs in), max and
+        # number of variants it occurs in
+        self.sum = []
+        self.min = []
+        self.max = []
+        self.seen = []
+        # Directly-follows pairs of activity ids to frequency
+        self.follows = dict()
+        # Distinct sets of activities (as bitmasks) seen so far
+        self._masks = set()
+
+    def _grow(self):
+        """Extends the per activity state to cover newly interned activities."""
+        missing = len(self.activity_names) - len(self.classes)
+        if missing <= 0:
+            return
+        self.together.extend([0] * missing)
+        self.after.extend([None] * missing)
+        self.before.extend([None] * missing)
+        self.classes.extend([0] * missing)
+        self.sum.extend([0] * missing)
+        self.min.extend([0] * missing)
+        self.max.extend([0] * missing)
+        self.seen.extend([0] * missing)
+
+    def add(self, variant, freq):
+        """Folds a single integer encoded variant, with its frequency, into the state.
+
+        Parameters
+        ----------
+        variant: sequence of `int`
+            a trace as a sequence of activity ids
+        freq: `int`
+            frequency of the trace
+        """
+        self._grow()
+        self.n_variants += 1
+
+        counts = dict()
+        follows = self.follows
+        prev = None
+        present = 0
+
+        # Counts, set of activities and directly-follows pairs
+        for a in variant:
+            if a in counts:
+                counts[a] += 1
+            else:
+                counts[a] = 1
+                present |= 1 << a
+
+            if prev is not None:
+                p = (prev, a)
+                if p in follows:
+                    follows[p] += freq
+                else:
+                    follows[p] = freq
+            prev = a
+
+        # Always-after: every activity occurring after the first occurrence of a
+        after = self.after
+        for a, mask in _successor_masks(variant).items():
+            after[a] = mask if after[a] is None else after[a] & mask
+
+        # Always-before: every activity occurring before the last occurrence of a
+        before = self.before
+        for a, mask in _predecessor_masks(variant).items():
+            before[a] = mask if before[a] is None else before[a] & mask
+
+        # Never-together: only a new set of activities can add co-occurrences
+        self.present |= present
+        if present not in self._masks:
+            self._masks.add(present)
+            for a in counts:
+                self.together[a] |= present
+
+        classes = self.classes
+        refined = dict()
+
+        for a, c in counts.items():
+            # Equivalence
+            key = (classes[a], c)
+            if key not in refined:
+                refined[key] = self._next_class
+                self._next_class += 1
+            classes[a] = refined[key]
+
+            # Statistics
+            self.sum[a] += c * freq
+            if self.seen[a] == 0 or c < self.min[a]:
+                self.min[a] = c
+            if c > self.max[a]:
+                self.max[a] = c
+            self.seen[a] += 1
+
+    def reweight(self, variant, delta):
+        """Adjusts the state to a change, by delta, of the frequency of a variant
+        which has already been folded into it. Only the frequency weighted
+        statistics (sums and directly-follows counts) depend on it.
+
+        Parameters
+        ----------
+        variant: sequence of `int`
+            a trace as a sequence of activity ids
+        delta: `int`
+            change of the frequency of the trace
+        """
+        for a in variant:
+            self.sum[a] += delta
+        for p in zip(variant, itertools.islice(variant, 1, None)):
+            self.follows[p] += delta
+
+    def merge(self, other):
+        """Merges the state accumulated by another engine, over a different set
+        of variants, into this one: the result is the same as if all the
+        variants had been folded into a single engine. Merging is associative,
+        so that the partial states of the shards of a log can be combined in
+        any grouping.
+
+        The activities of the other engine are matched by label and the new
+        ones are appended to `activity_names`, thus the engine should own its
+        activity labels (see `LogSkeleton.mine_partial`).
+
+        Parameters
+        ----------
+        other: `RelationEngine`
+            the engine to merge into this one
+
+        Returns
+        -------
+        `RelationEngine`
+            the engine itself
+        """
+        names = self.activity_names
+        ids = {name: idx for idx, name in enumerate(names)}
+        other._grow()
+
+        # Map the activity ids of the other engine onto the ones of this engine
+        mapping = list()
+        for name in other.activity_names:
+            if name not in ids:
+                ids[name] = len(names)
+                names.append(name)
+            mapping.append(ids[name])
+        self._grow()
+
+        def remap(mask):
+            remapped = 0
+            for b in _iter_bits(mask):
+                remapped |= 1 << mapping[b]
+            return remapped
+
+        self.n_variants += other.n_variants
+        self.present |= remap(other.present)
+        self._masks.update(remap(mask) for mask in other._masks)
+
+        for b, a in enumerate(mapping):
+            if other.together[b]:
+                self.together[a] |= remap(other.together[b])
+
+            for mine, theirs in ((self.after, other.after), (self.before, other.before)):
+                if theirs[b] is not None:
+                    mask = remap(theirs[b])
+                    mine[a] = mask if mine[a] is None else mine[a] & mask
+
+            if other.seen[b]:
+                if self.seen[a] == 0 or other.min[b] < self.min[a]:
+                    self.min[a] = other.min[b]
+                self.max[a] = max(self.max[a], other.max[b])
+                self.sum[a] += other.sum[b]
+                self.seen[a] += other.seen[b]
+
+        # Equivalence: intersect the two partitions, keeping class 0 for the
+        # activities absent from the variants of both engines
+        other_classes = [0] * len(names)
+        for b, a in enumerate(mapping):
+            other_classes[a] = other.classes[b]
+
+        refined = {(0, 0): 0}
+        for a, key in enumerate(zip(self.classes, other_classes)):
+            if key not in refined:
+                refined[key] = self._next_class
+                self._next_class += 1
+            self.classes[a] = refined[key]
+
+        for (a, b), freq in other.follows.items():
+            p = (mapping[a], mapping[b])
+            self.follows[p] = self.follows.get(p, 0) + freq
+
+        return self
+
+    def update(self, variants):
+        """Folds pairs of integer encoded variants and their frequency into the state.
+
+        Parameters
+        ----------
+        variants: iterable
+            pairs of integer encoded traces and frequencies
+            (see `TraceLog.encoded_variants`)
+        """
+        for variant, freq in variants:
+            self.add(variant, freq)
+
+        return self
+
+    def equivalence(self):
+        """Returns the pairs of activities which occur the same number of
+        times in every trace (in both orientations).
+        """
+        self._grow()
+        return _class_pairs(self.classes, self.activity_names)
+
+    def always_after(self):
+        """Returns the pairs (a, b) such that b always occurs after a."""
+        self._grow()
+        return _candidate_pairs(
+            self.after, self.activity_names, self.end, self.start, self.present
+        )
+
+    def always_before(self):
+        """Returns the pairs (a, b) such that b always occurs before a."""
+        self._grow()
+        return _candidate_pairs(
+            self.before, self.activity_names, self.start, self.end, self.present
+        )
+
+    def never_together(self):
+        """Returns the pairs of activities which never occur in the same trace,
+        in the (sorted) order of the labels.
+        """
+        self._grow()
+        names = self.activity_names
+        full = self.present
+        pairs = set()
+        for a in _iter_bits(full):
+            for b in _iter_bits(~self.together[a] & full & ~((2 << a) - 1)):
+                pairs.add(tuple(sorted((names[a], names[b]))))
+
+        return pairs
+
+    def dependency(self):
+        """Returns the directly-follows pairs of activities."""
+        names = self.activity_names
+        return set((names[a], names[b]) for a, b in self.follows)
+
+    def link(self):
+        """Returns a mapping from directly-follows pairs of activities to frequency."""
+        names = self.activity_names
+        return {(names[a], names[b]): freq for (a, b), freq in self.follows.items()}
+
+    def statistics(self):
+        """Returns a mapping from activity to its sum, min and max number of occurrences."""
+        self._grow()
+        names = self.activity_names
+        label_2_stats = dict()
+        for a in sorted(_iter_bits(self.present), key=names.__getitem__):
+            # An activity missing from any variant occurs there 0 times
+            min_c = self.min[a] if self.seen[a] == self.n_variants else 0
+            label_2_stats[names[a]] = {"sum": self.sum[a], "min": min_c, "max": self.max[a]}
+
+        return label_2_stats
+
+    def result(self, instrumentation=None):
+        """Returns a dict, containing the mapping of the strings "relationships"
+        and "statistics" to corresponding dict of relationships and statistics,
+        as returned by `LogSkeleton.mine`.
+
+        Parameters
+        ----------
+        instrumentation: `Instrumentation`
+            records every relationship and statistic as a stage, default None
+        """
+        steps = (
+            ("equivalence", self.equivalence),
+            ("alwaysAfter", self.always_after),
+            ("alwaysBefore", self.always_before),
+            ("neverTogether", self.never_together),
+            ("dependency", self.dependency),
+            ("node", self.statistics),
+            ("link", self.link),
+        )
+        labels = bin(self.present).count("1")
+
+        computed = dict()
+        for name, step in steps:
+            with _stage(instrumentation, name, variants=self.n_variants, labels=labels) as record:
+                computed[name] = step()
+                record["size"] = len(computed[name])
+
+        return {
+            "relationships": {
+                "equivalence": computed["equivalence"],
+                "alwaysAfter": computed["alwaysAfter"],
+                "alwaysBefore": computed["alwaysBefore"],
+                "neverTogether": computed["neverTogether"],
+                "dependency": computed["dependency"],
+            },
+            "statistics": {
+                "node": computed["node"],
+                "link": computed["link"],
+            },
+        }
@@ -1,14 +1,25 @@
 import abc
 import itertools
+from array import array
+
+from .engine import RelationEngine
+from .instrumentation import _stage
+from .objects import TraceLog
+from .utils import _iter_bits
+
+SKELETON_FORMAT = "skelevision.LogSkeleton"
+SKELETON_VERSION = 1
+
+RELATIONSHIPS = ("equivalence", "alwaysAfter", "alwaysBefore", "neverTogether", "dependency")
 
 class Miner(abc.ABC):
 
     @abc.abstractmethod
-    def load(self):
+    def load(self, filepath):
         pass
 
     @abc.abstractmethod
-    def save(self):
+    def save(self, result, filepath):
         pass
 
     @abc.abstractmethod
@@ -17,14 +28,120 @@ class Miner(abc.ABC):
 
 class LogSkeleton(Miner):
 
-    def load(self):
-        pass
+    @staticmethod
+    def load(filepath):
+        """Loads a mined log skeleton saved with `LogSkeleton.save`.
 
-    def save(self):
-        pass
+        Parameters
+        ----------
+        filepath: path-like
+            The path to the file, gzip compressed if it ends with `.gz`.
+
+        Returns
+        -------
+        `dict`
+            mapping of the strings "relationships" and "statistics"
+            to corresponding dict of relationships and statistics,
+            as returned by `LogSkeleton.mine`
+        """
+        import json
+
+        with _open(filepath, "rt") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != SKELETON_FORMAT:
+                raise ValueError("{} is not a saved log skeleton.".format(filepath))
+            if header.get("version") != SKELETON_VERSION:
+                raise ValueError(
+                    "Unsupported log skeleton version {}.".format(header.get("version"))
+                )
+
+            labels = header["labels"]
+            result = {"relationships": dict(), "statistics": dict()}
+
+            for row in f:
+                record = json.loads(row)
+                if "relationship" in record:
+                    pairs = set()
+                    for a, mask in enumerate(record["matrix"]):
+                        for b in _iter_bits(int(mask, 16)):
+                            pairs.add((labels[a], labels[b]))
+                    result["relationships"][record["relationship"]] = pairs
+                elif record.get("statistics") == "node":
+                    result["statistics"]["node"] = {
+                        labels[a]: {
+                            "sum": record["sum"][a],
+                            "min": record["min"][a],
+                            "max": record["max"][a],
+                        }
+                        for a in record["labels"]
+                    }
+                elif record.get("statistics") == "link":
+                    result["statistics"]["link"] = {
+                        (labels[a], labels[b]): freq for a, b, freq in record["pairs"]
+                    }
+
+        return result
+
+    @staticmethod
+    def save(result, filepath):
+        """Saves a mined log skeleton, as returned by `LogSkeleton.mine`, as JSON lines.
+
+        The first line is a header holding the format version and the activity
+        labels. Every relationship follows on its own line as a bit matrix
+        indexed by the labels: row a holds, as a hexadecimal bitmask, the
+        activities b of the pairs (a, b). The node and link statistics follow.
+
+        Parameters
+        ----------
+        result: `dict`
+            mapping of the strings "relationships" and "statistics"
+            to corresponding dict of relationships and statistics
+        filepath: path-like
+            The path to the file, gzip compressed if it ends with `.gz`.
+        """
+        import json
+
+        relationships = result["relationships"]
+        node = result["statistics"]["node"]
+        link = result["statistics"]["link"]
+
+        labels = set(node)
+        for pairs in itertools.chain(relationships.values(), [link]):
+            for pair in pairs:
+                labels.update(pair)
+        labels = sorted(labels)
+        ids = {label: idx for idx, label in enumerate(labels)}
+
+        with _open(filepath, "wt") as f:
+            header = {"format": SKELETON_FORMAT, "version": SKELETON_VERSION, "labels": labels}
+            f.write(json.dumps(header) + "\n")
+
+            for name in RELATIONSHIPS:
+                if name not in relationships:
+                    continue
+                matrix = [0] * len(labels)
+                for a, b in relationships[name]:
+                    matrix[ids[a]] |= 1 << ids[b]
+                record = {"relationship": name, "matrix": [format(row, "x") for row in matrix]}
+                f.write(json.dumps(record) + "\n")
+
+            record = {
+                "statistics": "node",
+                "labels": [ids[a] for a in node],
+                "sum": [node[a]["sum"] if a in node else 0 for a in labels],
+                "min": [node[a]["min"] if a in node else 0 for a in labels],
+                "max": [node[a]["max"] if a in node else 0 for a in labels],
+            }
+            f.write(json.dumps(record) + "\n")
+
+            record = {
+                "statistics": "link",
+                "pairs": [[ids[a], ids[b], freq] for (a, b), freq in link.items()],
+            }
+            f.write(json.dumps(record) + "\n")
 
     @staticmethod
-    def mine(log, reqA, forbA):
+    def mine(log, reqA, forbA, instrumentation=None):
         """Returns a dict, containing the mapping of the strings "relationships" and "statistics"
         to corresponding dict of relationships and statistics
 
@@ -38,6 +155,91 @@ class LogSkeleton(Miner):
         forbA: `set()`
             If one or more of the selected activities
             occurs in a trace, the entire trace will be filtered out.
+        instrumentation: `Instrumentation`
+            records the filtering, the pass over the variants and every
+            relationship and statistic as stages, default None
+
+        Returns
+        -------
+        `dict`
+            mapping of the strings "relationships" and "statistics"
+            to corresponding dict of relationships and statistics
+        """
+
+        # The sizes of a filtered view cost a pass over its traces: they are
+        # only computed when recorded
+        with _stage(instrumentation, "filter") as record:
+            if instrumentation is not None:
+                record["variants"] = len(log)
+                record["labels"] = len(log.labels)
+            tl = log.filter_traces(reqA, forbA)
+            if instrumentation is not None:
+                record["kept"] = len(tl)
+
+        # Steps 1-6: Mine every relationship and the statistics
+        # in a single pass over the variants of the log
+        with _stage(instrumentation, "fold") as record:
+            engine = RelationEngine(tl.activity_names)
+            engine.update(tl.encoded_variants())
+            record["variants"] = engine.n_variants
+            record["labels"] = bin(engine.present).count("1")
+
+        return engine.result(instrumentation)
+
+    @staticmethod
+    def mine_partial(log, reqA, forbA):
+        """Mines the mergeable partial state of a log skeleton from a shard of a log.
+
+        The partial states of the shards of a log, combined with
+        `RelationEngine.merge`, give the same log skeleton as mining the
+        whole log (see `RelationEngine.result`).
+
+        Parameters
+        ----------
+        log: `TraceLog`
+            tracelog object
+        reqA: `set()`
+            If one or more of the selected activities
+            does not occur in a trace, the entire trace will be filtered out.
+        forbA: `set()`
+            If one or more of the selected activities
+            occurs in a trace, the entire trace will be filtered out.
+
+        Returns
+        -------
+        `RelationEngine`
+            the partial state, owning a copy of the activity labels
+        """
+        tl = log.filter_traces(reqA, forbA)
+
+        engine = RelationEngine(list(tl.activity_names))
+        engine.update(tl.encoded_variants())
+
+        return engine
+
+    @staticmethod
+    def mine_sharded(shards, reqA, forbA, max_workers=None, executor=None):
+        """Mines the log skeleton of a log split in shards, mining every shard
+        stored in a file in a separate process and merging their partial states.
+
+        Parameters
+        ----------
+        shards: iterable
+            the shards of the log, as paths to files which the workers load
+            themselves, or as `TraceLog` objects, which are mined in the calling
+            process while the workers run, so that only the partial states
+            are ever sent between processes
+        reqA: `set()`
+            If one or more of the selected activities
+            does not occur in a trace, the entire trace will be filtered out.
+        forbA: `set()`
+            If one or more of the selected activities
+            occurs in a trace, the entire trace will be filtered out.
+        max_workers: `int`
+            Number of worker processes. Default None, thus one per processor.
+        executor: `concurrent.futures.Executor`
+            Executor the shards are submitted to. Default None, thus a new
+            `ProcessPoolExecutor` with max_workers processes.
 
         Returns
         -------
@@ -45,32 +247,340 @@ class LogSkeleton(Miner):
             mapping of the strings "relationships" and "statistics"
             to corresponding dict of relationships and statistics
         """
+        from concurrent.futures import ProcessPoolExecutor
+
+        reqA = set(reqA or ())
+        forbA = set(forbA or ())
+        shards = list(shards)
+        paths = [shard for shard in shards if not isinstance(shard, TraceLog)]
+
+        if executor is None and paths:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                return LogSkeleton.mine_sharded(shards, reqA, forbA, executor=pool)
+
+        futures = [executor.submit(_mine_shard, path, reqA, forbA) for path in paths]
+
+        engine = RelationEngine(list())
+        for shard in shards:
+            if isinstance(shard, TraceLog):
+                engine.merge(LogSkeleton.mine_partial(shard, reqA, forbA))
+        for future in futures:
+            engine.merge(future.result())
+
+        return engine.result()
+
+    @staticmethod
+    def mine_sample(log, reqA, forbA, sample_size=10000, tolerance=0.01, seed=None):
+        """Mines an approximate log skeleton from a sample of the traces of a log,
+        drawn with replacement, every variant with a probability proportional
+        to its frequency. Only the sampled variants are folded, once each, so
+        that the cost depends on the sample size rather than on the size of
+        the log.
+
+        Parameters
+        ----------
+        log: `TraceLog`
+            tracelog object
+        reqA: `set()`
+            If one or more of the selected activities
+            does not occur in a trace, the entire trace will be filtered out.
+        forbA: `set()`
+            If one or more of the selected activities
+            occurs in a trace, the entire trace will be filtered out.
+        sample_size: `int`
+            Number of traces drawn.
+        tolerance: `float`
+            Fraction of the traces which may violate a relationship pair,
+            see `SampledLogSkeleton.confidence`.
+        seed: `int`
+            Seed of the random generator, default None.
+
+        Returns
+        -------
+        `SampledLogSkeleton`
+            the approximate log skeleton and the confidence in its pairs
+        """
+        import random
 
         tl = log.filter_traces(reqA, forbA)
+        root = tl._root()
+        keys = list(tl)
+        draws = dict()
+        if keys:
+            cum_weights = list(itertools.accumulate(tl[key] for key in keys))
+            rng = random.Random(seed)
+            for key in rng.choices(keys, cum_weights=cum_weights, k=sample_size):
+                draws[key] = draws.get(key, 0) + 1
+
+        engine = RelationEngine(list(tl.activity_names))
+        engine.update((root._encoded(key), n) for key, n in draws.items())
+
+        return SampledLogSkeleton(
+            engine, draws, sum(tl.values()), len(draws) == len(keys), tolerance,
+            log, reqA, forbA,
+        )
 
-        # Augment the TraceLog object with unique start and end activities
-        result = {
-            "relationships": dict(),
-            "statistics": dict()
+
+class SampledLogSkeleton(object):
+    """Log skeleton mined from a sample of the traces of a log, as returned
+    by `LogSkeleton.mine_sample`.
+
+    The relationships hold in the sampled traces, thus some of them may be
+    violated by traces of the log which were not drawn. A pair is reported
+    with the probability that the sample would have caught its violation, if
+    at least a fraction `tolerance` of the traces it constrains violated it:
+    `1 - (1 - tolerance) ** k`, k being the number of drawn traces the pair
+    constrains (its support). The sums and link frequencies of the statistics
+    are scaled to the size of the log.
+
+    Attributes
+    ----------
+    result: `dict`
+        mapping of the strings "relationships" and "statistics" to
+        corresponding dict of relationships and statistics, as returned
+        by `LogSkeleton.mine`
+    confidence: `dict`
+        mapping from relationship to a mapping from each of its pairs to
+        the confidence it holds in the log
+    sample_size: `int`
+        number of traces drawn
+    exact: `bool`
+        True if every variant of the log was drawn, in which case the
+        relationships are exact
+    """
+
+    def __init__(self, engine, draws, n_traces, exact, tolerance, log, reqA, forbA):
+        self.sample_size = sum(draws.values())
+        self.exact = exact
+        self.tolerance = tolerance
+        self.log = log
+        self.reqA = reqA
+        self.forbA = forbA
+        self._verified = None
+
+        result = engine.result()
+        # Scale the frequency weighted statistics to the size of the log
+        scale = n_traces / float(self.sample_size) if self.sample_size else 0.0
+        for stats in result["statistics"]["node"].values():
+            stats["sum"] = int(round(stats["sum"] * scale))
+        link = result["statistics"]["link"]
+        for pair in link:
+            link[pair] = int(round(link[pair] * scale))
+        self.result = result
+
+        # Number of drawn traces each activity occurs in
+        support = dict()
+        for key, n in draws.items():
+            for a in set(key):
+                support[a] = support.get(a, 0) + n
+
+        def confidence(k):
+            return 1.0 if exact else 1.0 - (1.0 - tolerance) ** k
+
+        relationships = result["relationships"]
+        self.confidence = {
+            # Violated by a trace holding only one of the activities
+            "equivalence": {
+                (a, b): confidence(max(support[a], support[b]))
+                for a, b in relationships["equivalence"]
+            },
+            # Violated by a trace holding the first activity
+            "alwaysAfter": {
+                (a, b): confidence(support[a]) for a, b in relationships["alwaysAfter"]
+            },
+            "alwaysBefore": {
+                (a, b): confidence(support[a]) for a, b in relationships["alwaysBefore"]
+            },
+            # Violated by a trace holding both activities
+            "neverTogether": {
+                (a, b): confidence(support[a] + support[b])
+                for a, b in relationships["neverTogether"]
+            },
+            # Observed directly-follows pairs hold
+            "dependency": {pair: 1.0 for pair in relationships["dependency"]},
         }
 
-        # Step 1: Mine equivalence relationship
-        result['relationships']['equivalence'] = tl.equivalence()
+    def verify(self):
+        """Mines the full log and compares its relationships with the sampled
+        ones. The full log is only mined on the first call.
+
+        Returns
+        -------
+        `dict`
+            mapping from relationship to a dict holding the sets of its
+            "confirmed" pairs, the "spurious" sampled pairs which do not hold
+            in the log and the "missed" pairs of the log absent from the sample
+        """
+        if self._verified is None:
+            full = LogSkeleton.mine(self.log, self.reqA, self.forbA)
+            report = dict()
+            for name, pairs in self.result["relationships"].items():
+                expected = full["relationships"][name]
+                report[name] = {
+                    "confirmed": pairs & expected,
+                    "spurious": pairs - expected,
+                    "missed": expected - pairs,
+                }
+            self._verified = report
+
+        return self._verified
 
-        # Step 2: Mine always-after relationship
-        result['relationships']['alwaysAfter']  = tl.always_after()
 
-        # Step 3: Mine always-before relationship
-        result['relationships']['alwaysBefore'] = tl.always_before()
+class IncrementalLogSkeleton(Miner):
+    """Keeps a mined log skeleton up to date as traces are added to a log,
+    updating the relationships and statistics from the added traces only.
 
-        # Step 4: Mine never-together relationship
-        result['relationships']['neverTogether'] = tl.never_together()
+    The miner either subscribes to a `TraceLog` (see `mine`), following every
+    change made to it, or is fed batches of new traces (see `update`).
 
-        # Step 5: Mine never-together relationship
-        result['relationships']['dependency'] = set((tl.follows()).keys())
-        
-        # Step 6: Statistics
-        result['statistics']['node'] = tl.statistics()
-        result['statistics']['link'] = tl.follows()
+    Parameters
+    ----------
+    reqA: `set()`
+        If one or more of the selected activities
+        does not occur in a trace, the entire trace will be filtered out.
+    forbA: `set()`
+        If one or more of the selected activities
+        occurs in a trace, the entire trace will be filtered out.
+    """
 
-        return result
+    def __init__(self, reqA=None, forbA=None):
+        self.reqA = set(reqA or ())
+        self.forbA = set(forbA or ())
+        self.log = None
+        self._reset()
+
+    def _reset(self):
+        """Drops the mined state."""
+        # Activity label to the id it is interned to in the engine
+        self._activity_ids = dict()
+        self._engine = RelationEngine(list())
+        self._frequencies = dict()
+        self._stale = False
+
+    def _accepts(self, trace):
+        """Returns whether the trace passes the required and forbidden activities."""
+        activities = set(trace)
+        return self.reqA <= activities and not (self.forbA & activities)
+
+    def _add(self, trace, freq):
+        """Folds the addition of freq occurrences of a trace into the state."""
+        if not self._accepts(trace):
+            return
+
+        ids = self._activity_ids
+        names = self._engine.activity_names
+        variant = array("i")
+        for activity in trace:
+            idx = ids.get(activity)
+            if idx is None:
+                idx = len(names)
+                ids[activity] = idx
+                names.append(activity)
+            variant.append(idx)
+
+        if trace in self._frequencies:
+            self._frequencies[trace] += freq
+            self._engine.reweight(variant, freq)
+        else:
+            self._frequencies[trace] = freq
+            self._engine.add(variant, freq)
+
+    def _on_change(self, log, trace, old, new):
+        """Listener of the subscribed `TraceLog`."""
+        if new is None:
+            # Relationships cannot be weakened by removing a trace:
+            # the state is rebuilt from the log when next requested.
+            self._stale = True
+        elif not self._stale:
+            self._add(trace, new - (old or 0))
+
+    def mine(self, log):
+        """Mines the log and subscribes to it, so that the following changes
+        of its traces are folded into the mined skeleton.
+
+        Parameters
+        ----------
+        log: `TraceLog`
+            tracelog object
+
+        Returns
+        -------
+        `dict`
+            mapping of the strings "relationships" and "statistics"
+            to corresponding dict of relationships and statistics
+        """
+        self.close()
+        self._reset()
+        self.log = log
+        log.subscribe(self._on_change)
+        self.update(log.items())
+
+        return self.result()
+
+    def update(self, traces):
+        """Folds a batch of traces into the mined skeleton. The frequency of a trace
+        which has been added before is increased by the new frequency.
+
+        Parameters
+        ----------
+        traces: mapping or iterable
+            mapping from trace (a tuple of activities) to frequency,
+            or pairs of trace and frequency
+
+        Returns
+        -------
+        `IncrementalLogSkeleton`
+            the miner itself
+        """
+        if hasattr(traces, "items"):
+            traces = traces.items()
+
+        for trace, freq in traces:
+            self._add(trace, freq)
+
+        return self
+
+    def result(self):
+        """Returns the currently mined skeleton, in the form returned by `LogSkeleton.mine`."""
+        self._refresh()
+
+        return self._engine.result()
+
+    def _refresh(self):
+        """Rebuilds the state from the subscribed log, if a trace was deleted from it."""
+        if self._stale:
+            self._reset()
+            self.update(self.log.items())
+
+    def close(self):
+        """Stops following the changes of the subscribed log, keeping the
+        skeleton mined from its traces so far.
+        """
+        if self.log is not None:
+            self._refresh()
+            self.log.unsubscribe(self._on_change)
+            self.log = None
+
+    @staticmethod
+    def load(filepath):
+        """Loads a mined log skeleton, see `LogSkeleton.load`."""
+        return LogSkeleton.load(filepath)
+
+    @staticmethod
+    def save(result, filepath):
+        """Saves a mined log skeleton, see `LogSkeleton.save`."""
+        LogSkeleton.save(result, filepath)
+
+
+def _mine_shard(filepath, reqA, forbA):
+    """Mines the partial state of a log skeleton from a shard stored in a file."""
+    return LogSkeleton.mine_partial(TraceLog.from_file(filepath), reqA, forbA)
+
+
+def _open(filepath, mode):
+    """Opens a file, through gzip if its name ends with `.gz`."""
+    if str(filepath).endswith(".gz"):
+        import gzip
+
+        return gzip.open(filepath, mode, encoding="utf-8")
+    return open(filepath, mode, encoding="utf-8")
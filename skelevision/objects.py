@@ -1,17 +1,144 @@
-import gzip
+import functools
 import itertools
-import re
-import xml.etree.ElementTree as etree
+import struct
+import sys
+from array import array
+from collections import OrderedDict
 from collections.abc import MutableMapping
-from copy import deepcopy
-from io import BytesIO
 
-from lxml import etree as etree2
-from pm4py.objects.log.importer.xes import factory as xes_import_factory
 from sortedcontainers import SortedSet
 
+from .engine import _candidate_pairs, _class_pairs
 from .exceptions import IllegalLogAction
-from .utils import follows, predecessors, successors
+from .instrumentation import _stage
+from .trie import VariantTrie
+from .utils import (
+    _follows_profile,
+    _iter_bits,
+    _predecessor_masks,
+    _successor_masks,
+    _validate_distance,
+)
+
+# magic, version, little endian, number of labels, variants and events
+_BINARY_HEADER = struct.Struct("<6sH?xIQQ")
+_BINARY_MAGIC = b"SKVLOG"
+_BINARY_VERSION = 1
+
+_XES_NAMESPACE = "http://www.xes-standard.org/"
+
+
+def _align(position, alignment=8):
+    """Returns the first multiple of alignment greater or equal to position."""
+    return (position + alignment - 1) // alignment * alignment
+
+
+def _write_aligned(f, data):
+    """Pads the file to the next 8 byte boundary and writes data to it."""
+    f.write(b"\0" * (_align(f.tell()) - f.tell()))
+    f.write(data)
+
+
+def _open_compressed(filepath, mode, compression=None, **kwargs):
+    """Opens a file, through gzip or lzma if compression is "gzip" or "xz"
+    or, by default, if its name ends with `.gz` or `.xz`. The keyword
+    arguments are passed on to the opening function.
+    """
+    if compression is None:
+        if str(filepath).endswith(".gz"):
+            compression = "gzip"
+        elif str(filepath).endswith(".xz"):
+            compression = "xz"
+
+    if compression == "gzip":
+        import gzip
+
+        return gzip.open(filepath, mode, **kwargs)
+    if compression == "xz":
+        import lzma
+
+        return lzma.open(filepath, mode, **kwargs)
+    if compression is not None:
+        raise ValueError("Unsupported compression {}.".format(compression))
+    return open(filepath, mode, **kwargs)
+
+
+def _copy_result(result):
+    """Returns a copy of a derived result, which the caller is free to modify."""
+    if isinstance(result, set):
+        return set(result)
+    if isinstance(result, dict):
+        return {
+            k: _copy_result(v) if isinstance(v, (set, dict, list)) else v
+            for k, v in result.items()
+        }
+    if isinstance(result, list):
+        return [_copy_result(v) if isinstance(v, (set, dict, list)) else v for v in result]
+    return result
+
+
+def _memoized(method):
+    """Decorates a method of `TraceLog` deriving a result from the traces, so that
+    the result is cached on the log, per method and arguments, until the log changes.
+    """
+    # The arguments are bound from the code object rather than with `inspect`,
+    # which is slow to import
+    code = method.__code__
+    names = code.co_varnames[1:code.co_argcount]
+    defaults = dict(zip(names[len(names) - len(method.__defaults__ or ()):], method.__defaults__ or ()))
+    parameterized = len(names) > 0
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if parameterized:
+            bound = dict(defaults)
+            bound.update(zip(names, args))
+            bound.update(kwargs)
+            if len(args) > len(names) or len(bound) != len(names):
+                # Let the method raise the TypeError
+                return method(self, *args, **kwargs)
+            key = (method.__name__,) + tuple(bound[name] for name in names)
+        else:
+            key = (method.__name__,)
+        result = self._memoize(key, parameterized, lambda: method(self, *args, **kwargs))
+        return _copy_result(result)
+
+    return wrapper
+
+
+# Importers of TraceLog files, as (suffixes, importer) pairs
+_IMPORTERS = list()
+
+
+def register_importer(suffixes, importer):
+    """Registers an importer for the trace log files whose name ends with one
+    of the suffixes, see `TraceLog.from_file`. The last importer registered
+    for a suffix takes precedence.
+
+    Parameters
+    ----------
+    suffixes: `str` or `tuple` of `str`
+        the file name suffixes, matched regardless of case
+    importer: callable or `str`
+        called with the path to the file, and the keyword arguments given
+        to `TraceLog.from_file`, to return a `TraceLog`. A `"module:function"`
+        string is only imported when the first file is imported with it.
+    """
+    if isinstance(suffixes, str):
+        suffixes = (suffixes,)
+    _IMPORTERS.append((tuple(s.lower() for s in suffixes), importer))
+
+
+def _resolve_importer(importer):
+    """Returns the callable of a registered importer."""
+    if isinstance(importer, str):
+        import importlib
+
+        module, _, name = importer.partition(":")
+        importer = importlib.import_module(module)
+        for attribute in name.split("."):
+            importer = getattr(importer, attribute)
+    return importer
 
 
 class TraceLog(MutableMapping):
@@ -19,62 +146,323 @@ class TraceLog(MutableMapping):
     where the keys are tuples denoting individual traces
     (e.g. '("a", "b", "c")' denoted trace 'abc') and the values
     denote the frequencies of the traces.
+
+    Internally every activity label is interned to a small integer id and
+    every trace is kept as a compact integer array, on which all the
+    relationship methods operate. An inverted index, from every activity to
+    the traces it occurs in, answers `filter_traces`.
+
+    The results of the relationship methods and counters are cached until the
+    traces of the log change; calls with arguments (e.g. `follows(distance)`)
+    are kept in a least recently used cache of `cache_size` entries.
     """
 
+    cache_size = 32
+
     def __init__(self, *args, **kwargs):
+        self.__cache = dict()
+        self.__parameterized_cache = OrderedDict()
+        self.__cache_hits = 0
+        self.__cache_misses = 0
+        self.__version = 0
         self.__traces = dict()
         self.__traces.update(*args, **kwargs)
+        self.__variants = dict()
+        self.__activity_ids = dict()
+        self.__activity_names = list()
         self.__labels = SortedSet()
-
-        for trace in self.__traces:
-            for activity in trace:
-                self.__labels.add(activity)
+        self.__listeners = list()
+        # Every trace gets an id, in order of insertion, and is listed in the
+        # posting list of each one of its activities. The ids of deleted traces
+        # are marked by a None key and skipped when querying the postings.
+        self.__variant_ids = dict()
+        self.__variant_keys = list()
+        self.__postings = list()
+        # The event, offset and frequency columns of a log loaded with
+        # `load_binary`, until its traces are first needed
+        self.__columns = None
+
+        self.__add_variants(self.__traces)
+
+    def __getstate__(self):
+        # The variants of a loaded log are views on its mapped file
+        if self.__columns is not None:
+            self.__load()
+        state = dict(self.__dict__)
+        state["_TraceLog__variants"] = {
+            key: array("i", variant) for key, variant in self.__variants.items()
+        }
+        return state
 
     def __setitem__(self, key, value):
+        if self.__columns is not None:
+            self.__load()
         if not float(value).is_integer() or value < 0:
             raise IllegalLogAction(
                 "Cannot set value at key {} equal to {}.".format(key, value)
             )
+        old = self.__traces.get(key)
+        if old != value:
+            self.clear_cache()
         self.__traces[key] = value
-        # If there is a new activity add it to the set of labels
-        for activity in key:
-            self.__labels.add(activity)
+        # If there is a new trace, encode it (interning any new activity)
+        if key not in self.__variants:
+            self.__add_variant(key, self.__intern(key))
+
+        for listener in self.__listeners:
+            listener(self, key, old, value)
 
     def __getitem__(self, key):
+        if self.__columns is not None:
+            self.__load()
         return self.__traces[key]
 
     def __delitem__(self, key):
-        del self.__traces[key]
+        if self.__columns is not None:
+            self.__load()
+        old = self.__traces.pop(key)
+        del self.__variants[key]
+        self.__variant_keys[self.__variant_ids.pop(key)] = None
+        self.clear_cache()
+
+        for listener in self.__listeners:
+            listener(self, key, old, None)
 
     def __iter__(self):
+        if self.__columns is not None:
+            self.__load()
         return iter(self.__traces)
 
     def __len__(self):
+        if self.__columns is not None:
+            return len(self.__columns[2])
         return len(self.__traces)
 
     def __str__(self):
         """returns simple dict representation of the mapping"""
+        if self.__columns is not None:
+            self.__load()
         return str(self.__traces)
 
     def __repr__(self):
         """echoes class, id, & reproducible representation in the REPL"""
+        if self.__columns is not None:
+            self.__load()
         return "{}, D({})".format(super(TraceLog, self).__repr__(), self.__traces)
 
+    def __add_variants(self, keys):
+        """Encodes and registers new traces in bulk, adding their new
+        activities to the sorted labels at once.
+        """
+        ids = self.__activity_ids
+        names = self.__activity_names
+        n_names = len(names)
+        variants = self.__variants
+        variant_ids = self.__variant_ids
+        variant_keys = self.__variant_keys
+        postings = self.__postings
+        while len(postings) < n_names:
+            postings.append(array("i"))
+
+        for key in keys:
+            try:
+                encoded = array("i", map(ids.__getitem__, key))
+            except KeyError:
+                encoded = array("i")
+                for activity in key:
+                    idx = ids.get(activity)
+                    if idx is None:
+                        idx = len(names)
+                        ids[activity] = idx
+                        names.append(activity)
+                        postings.append(array("i"))
+                    encoded.append(idx)
+
+            # Same as `__add_variant`, inlined
+            vid = len(variant_keys)
+            variants[key] = encoded
+            variant_ids[key] = vid
+            variant_keys.append(key)
+            for a in set(encoded):
+                postings[a].append(vid)
+
+        if len(names) > n_names:
+            self.__labels.update(names[n_names:])
+            self.clear_cache()
+
+    def __load(self):
+        """Builds the traces of a log loaded with `load_binary`, and their
+        index, from its columns in bulk.
+        """
+        events, offsets, frequencies = self.__columns
+        self.__columns = None
+        names = self.__activity_names
+
+        variants = [events[start:end] for start, end in zip(offsets, offsets[1:])]
+        keys = [tuple(map(names.__getitem__, variant)) for variant in variants]
+        vids = range(len(keys))
+        self.__traces = dict(zip(keys, frequencies.tolist()))
+        self.__variants = dict(zip(keys, variants))
+        self.__variant_ids = dict(zip(keys, vids))
+        self.__variant_keys = keys
+
+        # All the postings in a single pass, the variant ids in increasing order
+        postings = [array("i") for _ in names]
+        for vid, variant in enumerate(variants):
+            for a in set(variant):
+                postings[a].append(vid)
+        self.__postings = postings
+
+    def __add_variant(self, key, encoded):
+        """Registers the encoding of a new trace and indexes its activities."""
+        vid = len(self.__variant_keys)
+        self.__variants[key] = encoded
+        self.__variant_ids[key] = vid
+        self.__variant_keys.append(key)
+
+        postings = self.__postings
+        for a in set(encoded):
+            while a >= len(postings):
+                postings.append(array("i"))
+            postings[a].append(vid)
+
     @property
     def labels(self):
         """Returns all the unique labels of activities in the trace log."""
         return self.__labels
 
+    def _label_mask(self):
+        """Returns the bitmask of the activity ids the relationships are computed over."""
+        return (1 << len(self.__activity_names)) - 1
+
+    def _memoize(self, key, parameterized, compute):
+        """Returns the cached result for key, computing it on a cache miss."""
+        cache = self.__parameterized_cache if parameterized else self.__cache
+
+        if key in cache:
+            self.__cache_hits += 1
+            if parameterized:
+                cache.move_to_end(key)
+            return cache[key]
+
+        self.__cache_misses += 1
+        result = compute()
+        cache[key] = result
+        if parameterized and len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+        return result
+
+    def cache_info(self):
+        """Returns a dict with the number of hits and misses of the cache of
+        derived results and the number of results it currently holds.
+        """
+        return {
+            "hits": self.__cache_hits,
+            "misses": self.__cache_misses,
+            "size": len(self.__cache) + len(self.__parameterized_cache),
+        }
+
+    def clear_cache(self):
+        """Drops every cached derived result."""
+        self.__version += 1
+        self.__cache.clear()
+        self.__parameterized_cache.clear()
+
+    def subscribe(self, listener):
+        """Registers a callable notified of every change to the traces of the log,
+        as `listener(log, trace, old, new)`: old is None for a new trace and
+        new is None for a deleted trace.
+        """
+        self.__listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Removes a callable registered with `subscribe`."""
+        self.__listeners.remove(listener)
+
+    @property
+    def activity_ids(self):
+        """Returns the mapping from activity label to its integer id."""
+        return self.__activity_ids
+
+    @property
+    def activity_names(self):
+        """Returns the list of activity labels, indexed by their integer id."""
+        return self.__activity_names
+
+    def encode(self, trace):
+        """Returns the integer encoding of a trace over the activities of the log.
+
+        Parameters
+        ----------
+        trace: `tuple` of `str`
+            a trace as a tuple of activities
+
+        Returns
+        -------
+        `array`
+            the ids of the activities in the trace
+        """
+        ids = self.__activity_ids
+        encoded = array("i")
+
+        for activity in trace:
+            idx = ids.get(activity)
+            if idx is None:
+                raise IllegalLogAction("Unknown activity {}.".format(activity))
+            encoded.append(idx)
+
+        return encoded
+
+    def __intern(self, trace):
+        """Returns the integer encoding of a trace, interning any activity
+        which has not been seen before.
+        """
+        ids = self.__activity_ids
+        encoded = array("i")
+
+        for activity in trace:
+            idx = ids.get(activity)
+            if idx is None:
+                idx = len(self.__activity_names)
+                ids[activity] = idx
+                self.__activity_names.append(activity)
+                self.__labels.add(activity)
+                self.clear_cache()
+            encoded.append(idx)
+
+        return encoded
+
+    def decode(self, encoded):
+        """Returns the trace (a tuple of activities) of an integer encoded trace."""
+        names = self.__activity_names
+        return tuple(names[idx] for idx in encoded)
+
+    def encoded_variants(self):
+        """Returns an iterator over pairs of integer encoded traces and their frequency."""
+        if self.__columns is not None:
+            events, offsets, frequencies = self.__columns
+            variants = (events[start:end] for start, end in zip(offsets, offsets[1:]))
+            return zip(variants, frequencies)
+        return zip(self.__variants.values(), self.__traces.values())
+
+    def to_trie(self):
+        """Returns the prefix tree of the traces of the log, a compact store of
+        logs whose traces share long prefixes, on which the follows, statistics
+        and always-after/before relationships are computed once per shared
+        prefix (see `VariantTrie`).
+        """
+        return VariantTrie.from_log(self)
+
     def augment(self, start="[>", end="[]"):
         """Returns a similar TraceLog object where each trace contains an aditional
         start and end activity.
         """
-        tl = TraceLog()
-        for key, value in self.__traces.items():
-            trace = (start,) + key + (end,)
-            tl[trace] = value
-        return tl
+        return TraceLog.from_counts(
+            ((start,) + key + (end,), value) for key, value in self.items()
+        )
 
+    @_memoized
     def follows(self, distance=1):
         """Returns a mapping (aka. dict) from pairs of activities to frequency.
         A pair (a, b) is part of the mapping if activity b follows activity a,
@@ -85,40 +473,149 @@ class TraceLog(MutableMapping):
         distance: int
             Distance two activities have to be appart to be counted in the mapping.
         """
+        _validate_distance(distance)
+        distance = int(distance)
         pairs = dict()
 
-        for trace in self.__traces:
-            # Get the follows mapping only for the current trace
-            f = follows(trace, distance=distance)
-
-            # Add all the items to the overall dictionary
-            for p, p_freq in f.items():
+        for variant, freq in self.encoded_variants():
+            for p in zip(variant, itertools.islice(variant, distance, None)):
                 # If it's not there yet, add the default value
                 if p not in pairs:
                     pairs[p] = 0
-                pairs[p] += p_freq * self.__traces[trace]
+                pairs[p] += freq
 
-        return pairs
+        names = self.__activity_names
+        return {(names[a], names[b]): freq for (a, b), freq in pairs.items()}
+
+    @_memoized
+    def follows_profile(self, max_distance=1, dense=False, eventually=True):
+        """Returns the frequencies of the pairs of activities which follow each
+        other at every distance up to max_distance, and at any distance
+        (eventually-follows), computed in a single pass over the traces.
+
+        Parameters
+        ----------
+        max_distance: int
+            Greatest distance two activities are counted at.
+        dense: bool
+            If True, the frequencies are returned as matrices (lists of rows),
+            indexed by the activity ids (see `activity_names`), otherwise as
+            mappings from pairs of activities to frequency, as `follows`.
+        eventually: bool
+            If False, the eventually-follows frequencies, whose number of
+            pairs grows with the square of the length of the traces, are not
+            computed.
 
-    def save_to_file(self, filepath, format="txt"):
-        """Save a TraceLog object as a `.txt` file.
+        Returns
+        -------
+        `dict`
+            mapping of the string "distances" to a mapping from every distance,
+            from 1 to max_distance, to its frequencies, and of the string
+            "eventually" to the eventually-follows frequencies (None if not computed)
         """
-        if len(self.__traces) == 0:
-            return False
+        _validate_distance(max_distance)
+        max_distance = int(max_distance)
+        names = self.__activity_names
+        n = len(names)
+
+        by_distance, anywhere = _follows_profile(
+            self.encoded_variants(), n, max_distance, eventually
+        )
+
+        def decode(pairs):
+            if dense:
+                matrix = [[0] * n for _ in range(n)]
+                for code, freq in pairs.items():
+                    a, b = divmod(code, n)
+                    matrix[a][b] = freq
+                return matrix
+            return {(names[code // n], names[code % n]): freq for code, freq in pairs.items()}
 
-        output = ""
+        return {
+            "distances": {d + 1: decode(pairs) for d, pairs in enumerate(by_distance)},
+            "eventually": decode(anywhere) if eventually else None,
+        }
 
-        if format == "txt":
-            for i, kv in enumerate(self.__traces.items()):
-                key = kv[0]
-                value = kv[1]
-                output += "{}x Case{} {}\n".format(value, i, " ".join(key))
+    def save_to_file(self, filepath, format="txt", compression=None, chunk_size=1 << 16):
+        """Save a TraceLog object as a `.txt` or a `.xes` file.
 
-        with open(filepath, "w") as f:
-            f.write(output)
+        The traces are streamed to the file, so that memory does not grow
+        with the size of the log: `.txt` lines are written in chunks of about
+        chunk_size characters and `.xes` traces one at a time, through
+        `lxml.etree.xmlfile`, every occurrence of a trace as its own case.
+
+        Parameters
+        ----------
+        filepath: path-like
+            The path to the file.
+        format: `str`
+            "txt" or "xes", default "txt".
+        compression: `str`
+            "gzip" or "xz". Default None, thus compressing if the path
+            ends with `.gz` or `.xz`.
+        chunk_size: `int`
+            Number of characters buffered between writes of a `.txt` file.
+
+        Returns
+        -------
+        `bool`
+            False if the log is empty and nothing was written, otherwise True.
+        """
+        if format not in ("txt", "xes"):
+            raise ValueError("Unsupported format {}.".format(format))
+        if len(self) == 0:
+            return False
+
+        with _open_compressed(filepath, "wb", compression) as f:
+            if format == "txt":
+                _write_txt(self, f, chunk_size)
+            else:
+                _write_xes(self, f)
 
         return True
 
+    def save_binary(self, filepath):
+        """Save a TraceLog object in the binary columnar format read by `load_binary`.
+
+        The file holds, after a fixed size header, the table of the activity
+        labels, the flat array of all the (integer encoded) events, the
+        offsets of every variant in the event array and the frequencies
+        of the variants. Every array starts at an 8 byte boundary.
+
+        Parameters
+        ----------
+        filepath: path-like
+            The path to the file.
+        """
+        names = [name.encode("utf-8") for name in self.__activity_names]
+        label_lengths = array("I", [len(name) for name in names])
+        offsets = array("q", [0])
+        frequencies = array("q")
+
+        for variant, freq in self.encoded_variants():
+            offsets.append(offsets[-1] + len(variant))
+            frequencies.append(int(freq))
+
+        with open(filepath, "wb") as f:
+            f.write(
+                _BINARY_HEADER.pack(
+                    _BINARY_MAGIC,
+                    _BINARY_VERSION,
+                    sys.byteorder == "little",
+                    len(names),
+                    len(frequencies),
+                    offsets[-1],
+                )
+            )
+            _write_aligned(f, label_lengths)
+            _write_aligned(f, b"".join(names))
+            _write_aligned(f, b"")
+            for variant, _ in self.encoded_variants():
+                f.write(variant)
+            _write_aligned(f, offsets)
+            _write_aligned(f, frequencies)
+
+    @_memoized
     def never_together(self):
         """Returns a set of tuples, representing the pairs of the activities
         which are never together in any of the traces.
@@ -129,21 +626,34 @@ class TraceLog(MutableMapping):
             the pairs of the activities which are never together in any of the traces
         """
 
-        pairs = set(itertools.combinations(self.labels, r=2))
-
-        for trace in self.__traces:
-            trace = SortedSet(trace)
-            trace_pairs = list(itertools.combinations(trace, r=2))
-            pairs_wc = deepcopy(pairs)
-
-            for pair in pairs:
-                if pair in trace_pairs:
-                    pairs_wc.discard(pair)
-
-            pairs = pairs_wc
+        names = self.__activity_names
+
+        # Reduce every trace to the bitmask of its activities. Traces with
+        # the same set of activities are only considered once.
+        masks = set()
+        for variant, _ in self.encoded_variants():
+            mask = 0
+            for a in set(variant):
+                mask |= 1 << a
+            masks.add(mask)
+
+        # Row a holds every activity occurring together with activity a
+        together = [0] * len(names)
+        for mask in masks:
+            for a in _iter_bits(mask):
+                together[a] |= mask
+
+        full = self._label_mask()
+        pairs = set()
+        for a in _iter_bits(full):
+            # Only consider the activities b > a, to report every pair once
+            for b in _iter_bits(~together[a] & full & ~((2 << a) - 1)):
+                # Report every pair in the (sorted) order of the labels
+                pairs.add(tuple(sorted((names[a], names[b]))))
 
         return pairs
 
+    @_memoized
     def equivalence(self):
         """Returns a set of tuples, representing the pairs of the activities
         which are always together in all of the traces the same number of times.
@@ -154,43 +664,26 @@ class TraceLog(MutableMapping):
             the pairs of the activities which are always together in all of the
             traces the same number of times
         """
-        R_eq_trace = dict()
-
-        for trace in self.__traces:
-            # Extract pairs in current trace
-            w = dict()
-            f2a = TraceLog.freq_2_activities(trace)
-            for s in f2a.values():
-                for pair in itertools.product(s, repeat=2):
-                    if pair[0] == pair[1]:
-                        continue
-                    if pair[0] not in w:
-                        w[pair[0]] = list()
-                    w[pair[0]].append(pair[1])
-
-            # Check if the relationships found till now still hold
-            for pair, value in R_eq_trace.items():
-                if value:
-                    if pair[0] not in w and pair[1] not in w:
-                        continue
-                    if pair[0] in w and pair[1] not in w[pair[0]]:
-                        R_eq_trace[pair] = False
-                        R_eq_trace[pair[::-1]] = False
-
-            # Check if there are new values to be added
-            for v0, values in w.items():
-                for v1 in values:
-                    if (v0, v1) not in R_eq_trace:
-                        R_eq_trace[(v0, v1)] = True
-
-        # Transform the dict to set
-        R_eq = set()
-        for pair, value in R_eq_trace.items():
-            if value:
-                R_eq.add(pair)
-
-        return R_eq
-
+        names = self.__activity_names
+
+        # Partition the activities by the number of times they occur in every
+        # trace: each trace splits the classes of its activities by their count.
+        # Class 0 holds the activities which did not occur in any trace yet.
+        classes = [0] * len(names)
+        next_class = 1
+
+        for variant, _ in self.encoded_variants():
+            refined = dict()
+            for a, c in self.activity_2_freq(variant).items():
+                key = (classes[a], c)
+                if key not in refined:
+                    refined[key] = next_class
+                    next_class += 1
+                classes[a] = refined[key]
+
+        return _class_pairs(classes, names)
+
+    @_memoized
     def always_after(self):
         """Returns a set of tuples, representing the pairs of the activities
         which after any occurrence of the first activity the second activity always occurs.
@@ -201,25 +694,19 @@ class TraceLog(MutableMapping):
             pairs of the activities which after any occurrence of the first activity the
             second activity always occurs.
         """
-        pairs = set(itertools.permutations(self.labels, r=2))
+        names = self.__activity_names
 
-        # Remove impossible pairs
-        first = "[>"
-        last = "[]"
-        pairs = set(
-            [(a, b) for a, b in pairs if (a, b) != (a, first) and (a, b) != (last, b)]
-        )
+        # Per activity, the bitmask of the activities which are still candidates
+        candidates = [None] * len(names)
 
-        for trace in self.__traces:
-            s = successors(trace)
+        for variant, _ in self.encoded_variants():
+            for a, mask in _successor_masks(variant).items():
+                candidates[a] = mask if candidates[a] is None else candidates[a] & mask
 
-            pairs_wc = set(
-                [(a, b) for a, b in pairs if a in s.keys() and b not in s[a]]
-            )
-            pairs = pairs - pairs_wc
-
-        return pairs
+        # Remove impossible pairs
+        return _candidate_pairs(candidates, names, "[]", "[>", self._label_mask())
 
+    @_memoized
     def always_before(self):
         """Returns a set of tuples, representing the pairs of the activities
         which before any occurrence of the first activity the second activity always occurs.
@@ -230,24 +717,17 @@ class TraceLog(MutableMapping):
             pairs of the activities which before any occurrence of the first activity the
             second activity always occurs.
         """
-        pairs = set(itertools.permutations(self.labels, r=2))
-
-        # remove impossible pairs
-        first = "[>"
-        last = "[]"
-        pairs = set(
-            [(a, b) for a, b in pairs if (a, b) != (first, b) and (a, b) != (a, last)]
-        )
+        names = self.__activity_names
 
-        for trace in self.__traces:
-            p = predecessors(trace)
+        # Per activity, the bitmask of the activities which are still candidates
+        candidates = [None] * len(names)
 
-            pairs_wc = set(
-                [(a, b) for a, b in pairs if a in p.keys() and b not in p[a]]
-            )
-            pairs = pairs - pairs_wc
+        for variant, _ in self.encoded_variants():
+            for a, mask in _predecessor_masks(variant).items():
+                candidates[a] = mask if candidates[a] is None else candidates[a] & mask
 
-        return pairs
+        # Remove impossible pairs
+        return _candidate_pairs(candidates, names, "[>", "[]", self._label_mask())
 
     @staticmethod
     def activity_2_freq(trace):
@@ -294,6 +774,7 @@ class TraceLog(MutableMapping):
             f2a[value].add(key)
         return f2a
 
+    @_memoized
     def statistics(self):
         """Returns a dict, representing a Mapping from activity to it's 
         statistics, min, max and total occurance of the activity in the TraceLog.
@@ -319,6 +800,7 @@ class TraceLog(MutableMapping):
 
         return label_2_stats
 
+    @_memoized
     def sum_counter(self):
         """Returns a dict, representing a Mapping from activity to the amount of times the activity
         appears in the TraceLog.
@@ -335,15 +817,17 @@ class TraceLog(MutableMapping):
         """
         sum_c = dict()
 
-        for trace in self.__traces:
-            cur = self.activity_2_freq(trace)
+        for variant, freq in self.encoded_variants():
+            cur = self.activity_2_freq(variant)
             for k, v in cur.items():
                 if k not in sum_c:
                     sum_c[k] = 0
-                sum_c[k] += v * self.__traces[trace]
+                sum_c[k] += v * freq
 
-        return sum_c
+        names = self.__activity_names
+        return {names[k]: v for k, v in sum_c.items()}
 
+    @_memoized
     def min_counter(self):
         """Returns a dict, representing a Mapping from activity to the min amount of times the
         activity appears in any trace of the TraceLog.
@@ -357,20 +841,31 @@ class TraceLog(MutableMapping):
         'dict'
             Mapping from activity to the min amount of times the activity appears in any trace of the TraceLog.
         """
-        base = dict()
-        for a in self.labels:
-            base[a] = 0
+        names = self.__activity_names
+        # Minimum over the traces each activity occurs in, and their number
         min_c = dict()
-        for trace in self.__traces:
-            cur = deepcopy(base)
-            cur.update(self.activity_2_freq(trace))
-            for k, v in cur.items():
+        seen = dict()
+        n_variants = 0
+        for variant, _ in self.encoded_variants():
+            n_variants += 1
+            for k, v in self.activity_2_freq(variant).items():
                 if k not in min_c:
                     min_c[k] = v
-                elif v < min_c[k]:
-                    min_c[k] = v
-        return min_c
-
+                    seen[k] = 1
+                else:
+                    seen[k] += 1
+                    if v < min_c[k]:
+                        min_c[k] = v
+
+        if n_variants == 0:
+            return dict()
+        # An activity missing from any trace occurs there 0 times
+        return {
+            names[k]: min_c[k] if seen.get(k) == n_variants else 0
+            for k in _iter_bits(self._label_mask())
+        }
+
+    @_memoized
     def max_counter(self):
         """Returns a dict, representing a Mapping from activity to the max amount of times the
         activity appears in any trace of the TraceLog.
@@ -386,14 +881,16 @@ class TraceLog(MutableMapping):
         """
         
         max_c = dict()
-        for trace in self.__traces:
-            cur = self.activity_2_freq(trace)
+        for variant, _ in self.encoded_variants():
+            cur = self.activity_2_freq(variant)
             for k, v in cur.items():
                 if k not in max_c:
                     max_c[k] = v
                 elif v > max_c[k]:
                     max_c[k] = v
-        return max_c
+
+        names = self.__activity_names
+        return {names[k]: v for k, v in max_c.items()}
 
     def filter_traces(self, reqA=None, forbA=None):
         """Filters the tracelog based on required and forbidden activities.
@@ -410,46 +907,135 @@ class TraceLog(MutableMapping):
         Returns
         -------
         `TraceLog`
-            Mapping from activity to coresponding event list.
+            A read-only view on the traces of the log which pass the filter,
+            sharing their storage with the log. `TraceLog(view)` copies it
+            into a new, modifiable, log.
         """
-        
-        if reqA is None:
-            reqA = []
-        if forbA is None:
-            forbA = []
-
-        if not isinstance(reqA, list):
-            reqA = list(reqA)
-        if not isinstance(forbA, list):
-            forbA = list(forbA)
-
-        traces = list(self.__traces)
-        to_remove_idx = list()
-
-        for i, trace in enumerate(traces):
-
+        reqA = set(reqA or ())
+        forbA = set(forbA or ())
+
+        log = self._root()
+        if log.__columns is not None:
+            log.__load()
+        ids = self.__activity_ids
+        postings = log.__postings
+
+        # Intersect the postings of the required activities, smallest first
+        if reqA:
+            required = list()
             for a in reqA:
-                if a not in trace:
-                    to_remove_idx.append(i)
-                    break
+                idx = ids.get(a)
+                if idx is None or idx >= len(postings):
+                    return log._view([])
+                required.append(postings[idx])
+            required.sort(key=len)
+
+            selected = set(required[0])
+            for posting in required[1:]:
+                selected.intersection_update(posting)
+        else:
+            selected = set(range(len(log.__variant_keys)))
+
+        selection = self._selection()
+        if selection is not None:
+            selected &= selection
+
+        # Subtract the postings of the forbidden activities
+        for a in forbA:
+            idx = ids.get(a)
+            if idx is not None and idx < len(postings):
+                selected.difference_update(postings[idx])
+
+        keys = log.__variant_keys
+        return log._view(sorted(vid for vid in selected if keys[vid] is not None))
+
+    def _view(self, vids):
+        """Returns a read-only view on the traces of the log with the given ids."""
+        view = _TraceLogView(self, vids)
+        view.__activity_ids = self.__activity_ids
+        view.__activity_names = self.__activity_names
+        return view
+
+    def _root(self):
+        """Returns the log holding the traces (and their index) of this log."""
+        return self
+
+    def _selection(self):
+        """Returns the set of ids of the traces of this log, None standing for all the traces."""
+        return None
+
+    def _state_version(self):
+        """Returns a number which changes every time the log changes."""
+        return self.__version
+
+    def _variant_id(self, key):
+        """Returns the id of a trace, None if it is not part of the log."""
+        if self.__columns is not None:
+            self.__load()
+        return self.__variant_ids.get(key)
+
+    def _variant_key(self, vid):
+        """Returns the trace with the given id, None if it has been deleted."""
+        if self.__columns is not None:
+            self.__load()
+        return self.__variant_keys[vid]
+
+    def _encoded(self, key):
+        """Returns the integer encoding of a trace of the log."""
+        if self.__columns is not None:
+            self.__load()
+        return self.__variants[key]
 
-            for a in forbA:
-                if a in trace:
-                    to_remove_idx.append(i)
-                    break
+    @staticmethod
+    def from_counts(counts):
+        """Returns a TraceLog of traces and their frequencies, built in bulk: the
+        frequencies are validated at once and the labels are sorted only once,
+        which makes it the fastest way to build a large log.
 
-        filtered_traces = [
-            trace for i, trace in enumerate(traces) if i not in to_remove_idx
-        ]
+        Parameters
+        ----------
+        counts: mapping or iterable
+            mapping from trace (a tuple of activities) to frequency, e.g. a
+            `collections.Counter` of traces, or pairs of trace and frequency
 
-        filtered_log = TraceLog()
-        for trace in filtered_traces:
-            filtered_log[trace] = self[trace]
+        Returns
+        -------
+        `TraceLog`
+            Mapping from activity to coresponding event list.
+        """
+        if hasattr(counts, "items"):
+            traces = dict(counts)
+        else:
+            traces = dict()
+            for key, value in counts:
+                if key in traces:
+                    raise IllegalLogAction(
+                        "Attempting to add trace {} twice.".format(key)
+                    )
+                traces[key] = value
+
+        # Non-negative integers fit in an array at C speed, anything
+        # else (e.g. integral floats) is checked one by one
+        try:
+            frequencies = array("q", traces.values())
+            valid = len(frequencies) == 0 or min(frequencies) >= 0
+        except (TypeError, OverflowError):
+            valid = False
+        if not valid:
+            for key, value in traces.items():
+                if not float(value).is_integer() or value < 0:
+                    raise IllegalLogAction(
+                        "Cannot set value at key {} equal to {}.".format(key, value)
+                    )
 
-        return filtered_log
+        tl = TraceLog()
+        tl.__traces = traces
+        tl.__add_variants(traces)
+
+        return tl
 
     @staticmethod
-    def from_txt(filepath, delimiter=None, frequency_idx=0, first_activity_idx=2):
+    def from_txt(filepath, delimiter=None, frequency_idx=0, first_activity_idx=2, instrumentation=None):
         """Parses a `.txt` file containing a trace log and returns a TraceLog object of it.
 
         Parameters
@@ -462,46 +1048,240 @@ class TraceLog(MutableMapping):
             Default 0.
         first_activity_idx: `int`
             Default 2.
+        instrumentation: `Instrumentation`
+            records the import as a stage, default None
 
         Returns
         -------
         `TraceLog`
             Mapping from activity to coresponding event list.
         """
-        
+
+        with _stage(instrumentation, "from_txt", file=str(filepath)) as record:
+            traces = dict()
+
+            with _open_compressed(filepath, "rt") as f:
+                for row in f:
+
+                    row = row.strip()
+                    if len(row) == 0:
+                        continue
+
+                    parts = row.split(delimiter)
+                    a = tuple(parts[first_activity_idx:])
+                    try:
+                        frequency = int((parts[frequency_idx]).replace("x", ""))
+                    except Exception:
+                        raise IllegalLogAction("No frequency for trace: {}.".format(a))
+
+                    if a in traces:
+                        raise IllegalLogAction(
+                            "Attempting to add trace {} twice.".format(a)
+                        )
+
+                    traces[a] = frequency
+
+            tl = TraceLog.from_counts(traces)
+            record["variants"] = len(tl)
+            record["labels"] = len(tl.labels)
+
+        return tl
+
+    @staticmethod
+    def from_file(filepath, **kwargs):
+        """Imports a trace log file with the importer registered for the suffix
+        of its name (see `register_importer`), `.xes`, `.gz` and `.txt` files
+        being imported by default with `from_xes` and `from_txt`. Files with
+        any other suffix are loaded with `load_binary`.
+
+        Parameters
+        ----------
+        filepath: path-like
+            The path to the file.
+        kwargs:
+            Keyword arguments of the importer.
+
+        Returns
+        -------
+        `TraceLog`
+            Mapping from activity to coresponding event list.
+        """
+        name = str(filepath).lower()
+        for suffixes, importer in reversed(_IMPORTERS):
+            if name.endswith(suffixes):
+                return _resolve_importer(importer)(filepath, **kwargs)
+
+        return TraceLog.load_binary(filepath, **kwargs)
+
+    @staticmethod
+    def load_binary(filepath):
+        """Loads a TraceLog object saved with `save_binary`.
+
+        The file is memory-mapped and the variants of the log are views
+        on the mapped event array, thus they are never copied in memory.
+        Only the activity labels are decoded: the traces (the keys of the
+        mapping) and their index are built in bulk the first time they are
+        needed, while the relationships and counters are computed right
+        away from the columns.
+
+        Parameters
+        ----------
+        filepath: path-like
+            The path to the file.
+
+        Returns
+        -------
+        `TraceLog`
+            Mapping from activity to coresponding event list.
+        """
+        import mmap
+
+        with open(filepath, "rb") as f:
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        if len(buffer) < _BINARY_HEADER.size:
+            raise IllegalLogAction("{} is not a binary trace log.".format(filepath))
+
+        header = _BINARY_HEADER.unpack_from(buffer)
+        magic, version, little, n_labels, n_variants, n_events = header
+        if magic != _BINARY_MAGIC or version != _BINARY_VERSION:
+            raise IllegalLogAction("{} is not a binary trace log.".format(filepath))
+
+        position = _BINARY_HEADER.size
+
+        def read(typecode, n, itemsize):
+            nonlocal position
+            start = _align(position)
+            position = start + n * itemsize
+            view = buffer[start:position].cast(typecode)
+            if little != (sys.byteorder == "little"):
+                # Written on a machine with a different byte order
+                view = array(typecode, view.tobytes())
+                view.byteswap()
+            return view
+
+        label_lengths = read("I", n_labels, 4)
+        blob = read("B", sum(label_lengths), 1)
+        names = []
+        start = 0
+        for length in label_lengths:
+            names.append(str(blob[start:start + length], "utf-8"))
+            start += length
+
+        events = read("i", n_events, 4)
+        offsets = read("q", n_variants + 1, 8)
+        frequencies = read("q", n_variants, 8)
+
         tl = TraceLog()
+        tl.__activity_ids.update(zip(names, range(len(names))))
+        tl.__activity_names.extend(names)
+        tl.__labels.update(names)
+        tl.__columns = (events, offsets, frequencies)
 
-        with open(filepath, "r") as f:
-            for row in f:
+        return tl
 
-                row = row.strip()
-                if len(row) == 0:
-                    continue
+    @staticmethod
+    def from_csv(filepath, case="case", activity="activity", timestamp=None, delimiter=",",
+                 header=True, sorted_by_case=False, parse_timestamp=None, processes=None,
+                 chunk_size=1 << 20, encoding="utf-8", instrumentation=None):
+        """Parses a `.csv` file, or a `.gz` or `.xz` compressed one, holding an
+        event per row and returns a TraceLog object of it.
 
-                parts = row.split(delimiter)
-                a = tuple(parts[first_activity_idx:])
-                try:
-                    frequency = int((parts[frequency_idx]).replace("x", ""))
-                except Exception:
-                    raise IllegalLogAction("No frequency for trace: {}.".format(a))
+        The events are grouped by case. Unless the rows are sorted by case,
+        all the events are held until the end of the file, and the events of
+        every case are then ordered by timestamp (if given, otherwise the order
+        of the rows is kept). Activity labels are interned while reading.
 
-                if a in tl:
-                    raise IllegalLogAction(
-                        "Attempting to add trace {} twice.".format(a)
+        Parameters
+        ----------
+        filepath: path-like
+            The path to the `.csv` file.
+        case: `str` or `int`
+            Name, or index, of the case id column.
+        activity: `str` or `int`
+            Name, or index, of the activity column.
+        timestamp: `str` or `int`
+            Name, or index, of the timestamp column. Default None, thus
+            ordering the events of a case as the rows.
+        delimiter: `str`
+            Character delimiting the different values. Default ",".
+        header: `bool`
+            If True, the first row holds the names of the columns.
+        sorted_by_case: `bool`
+            If True, the rows of every case are consecutive and ordered, which
+            lets the cases be folded as soon as they end, in constant memory.
+        parse_timestamp: callable
+            Converts the timestamps, which are otherwise compared as strings
+            (e.g. ISO 8601). It has to be picklable if processes are used.
+        processes: `int`
+            Number of worker processes parsing an uncompressed file in
+            parallel, each one a chunk of the file split at line boundaries
+            (fields may thus not span lines). Default None, thus parsing in
+            the current process.
+        chunk_size: `int`
+            Number of bytes read from the file at once.
+        encoding: `str`
+            Encoding of the file, default "utf-8".
+        instrumentation: `Instrumentation`
+            records the import as a stage, default None
+
+        Returns
+        -------
+        `TraceLog`
+            Mapping from activity to coresponding event list.
+        """
+        import csv
+
+        with _stage(instrumentation, "from_csv", file=str(filepath), processes=processes) as record:
+            compressed = str(filepath).endswith((".gz", ".xz"))
+
+            if processes is not None and processes > 1 and not compressed:
+                from concurrent.futures import ProcessPoolExecutor
+
+                with open(filepath, "rb") as f:
+                    first = f.readline() if header else b""
+                names = next(csv.reader([first.decode(encoding)], delimiter=delimiter), None)
+                columns = _csv_columns(names, (case, activity, timestamp))
+                args = (encoding, delimiter) + tuple(columns) + (sorted_by_case, parse_timestamp)
+
+                # A few chunks per process balance the work
+                ranges = _csv_line_ranges(filepath, len(first), processes * 4)
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    futures = [
+                        executor.submit(_parse_csv_range, filepath, start, end, *args)
+                        for start, end in ranges
+                    ]
+                    parts = [future.result() for future in futures]
+            else:
+                with _open_compressed(filepath, "rt", encoding=encoding, newline="") as f:
+                    lines = itertools.chain.from_iterable(
+                        iter(functools.partial(f.readlines, chunk_size), [])
                     )
+                    rows = csv.reader(lines, delimiter=delimiter)
+                    names = next(rows, None) if header else None
+                    columns = _csv_columns(names, (case, activity, timestamp))
+                    parts = [_read_csv_events(rows, *columns, sorted_by_case, parse_timestamp)]
 
-                tl[a] = frequency
+            tl = TraceLog.from_counts(_fold_csv_events(parts, sorted_by_case, timestamp is not None))
+            record["variants"] = len(tl)
+            record["labels"] = len(tl.labels)
 
         return tl
 
     @staticmethod
-    def from_xes(filepath):
+    def from_xes(filepath, processes=None, instrumentation=None):
         """Parses a `.xes` or a `.gz` file containing a trace log and returns a TraceLog object of it.
 
         Parameters
         ----------
         filepath: path-like
             The path to the `.xes` or `.gz` file.
+        processes: `int`
+            Number of worker processes parsing an uncompressed `.xes` file in
+            parallel, each one a chunk of the file split at `<trace>` boundaries.
+            Default None, thus parsing in the current process.
+        instrumentation: `Instrumentation`
+            records the import as a stage, default None
 
         Returns
         -------
@@ -509,37 +1289,433 @@ class TraceLog(MutableMapping):
             Mapping from activity to coresponding event list.
         """
 
-        file_context = filepath
+        with _stage(instrumentation, "from_xes", file=str(filepath), processes=processes) as record:
+            if str(filepath).endswith((".gz", ".xz")):
+                # Stream straight from the decompressing file object
+                with _open_compressed(filepath, "rb") as f:
+                    tracelog = TraceLog._parse_xes(f)
+            elif processes is not None and processes > 1:
+                tracelog = _parse_xes_parallel(filepath, processes)
+            else:
+                tracelog = TraceLog._parse_xes(filepath)
 
-        if filepath.endswith(".gz"):
-            with gzip.open(filepath, "r") as f:
-                file_context = BytesIO(f.read())
+            tl = TraceLog.from_counts(tracelog)
+            record["variants"] = len(tl)
+            record["labels"] = len(tl.labels)
 
-        context = etree2.iterparse(file_context, events=["start", "end"])
+        return tl
 
-        in_event = False
+    @staticmethod
+    def _parse_xes(source):
+        """Parses the traces of a XES document and returns a mapping from trace
+        (a tuple of activities) to frequency.
+
+        Only the `<trace>` elements are materialized, one at a time: every parsed
+        trace is cleared, together with its preceding siblings, so that memory
+        stays bounded by the size of a single trace.
+
+        Parameters
+        ----------
+        source: path-like or file-like
+            The XES document.
+
+        Returns
+        -------
+        `dict`
+            Mapping from trace to frequency.
+        """
+        from lxml import etree
+
+        context = etree.iterparse(source, events=("end",), tag="{*}trace")
         tracelog = dict()
 
-        for tree_event, elem in context:
-            if elem.tag.endswith("trace"):
-                if tree_event == "start":
-                    trace = ()
-                else:
-                    if trace not in tracelog:
-                        tracelog[trace] = 0
-                    tracelog[trace] += 1
+        for _, elem in context:
+            trace = ()
+            for event in elem.iterchildren("{*}event"):
+                for attribute in event.iterchildren():
+                    if attribute.get("key") == "concept:name":
+                        trace += (attribute.get("value"),)
+                        break
+
+            if trace not in tracelog:
+                tracelog[trace] = 0
+            tracelog[trace] += 1
+
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
 
-            if elem.tag.endswith("event"):
-                in_event = tree_event == "start"
+        del context
 
-            if (
-                in_event
-                and "key" in elem.attrib
-                and elem.attrib["key"] == "concept:name"
-            ):
-                if tree_event == "start":
-                    trace += (elem.attrib["value"],)
+        return tracelog
 
-            elem.clear()
 
-        return TraceLog(tracelog)
+class _TraceLogView(TraceLog):
+    """A read-only view on some of the traces of a `TraceLog`, as returned by
+    `TraceLog.filter_traces`.
+
+    The view shares the encoded traces and the activity table of the log,
+    thus creating it costs no copy. The frequencies seen through the view
+    follow the ones of the log, traces deleted from the log disappear from it.
+    """
+
+    def __init__(self, log, vids):
+        super(_TraceLogView, self).__init__()
+        self._log = log
+        self._vids = vids
+        self._selected = set(vids)
+        self._log_version = log._state_version()
+
+    def __setitem__(self, key, value):
+        raise IllegalLogAction("Cannot modify a filtered view of a trace log.")
+
+    def __delitem__(self, key):
+        raise IllegalLogAction("Cannot modify a filtered view of a trace log.")
+
+    def __getitem__(self, key):
+        if self._log._variant_id(key) not in self._selected:
+            raise KeyError(key)
+        return self._log[key]
+
+    def __iter__(self):
+        for vid in self._vids:
+            key = self._log._variant_key(vid)
+            if key is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __str__(self):
+        """returns simple dict representation of the mapping"""
+        return str(dict(self.items()))
+
+    def __repr__(self):
+        """echoes class, id, & reproducible representation in the REPL"""
+        return "{}, D({})".format(object.__repr__(self), dict(self.items()))
+
+    @property
+    def labels(self):
+        """Returns all the unique labels of activities in the traces of the view."""
+        names = self.activity_names
+        return SortedSet(names[a] for a in _iter_bits(self._label_mask()))
+
+    @_memoized
+    def _label_mask(self):
+        """Returns the bitmask of the activity ids occurring in the traces of the view."""
+        mask = 0
+        for variant, _ in self.encoded_variants():
+            for a in set(variant):
+                mask |= 1 << a
+        return mask
+
+    def _memoize(self, key, parameterized, compute):
+        # Cached results are dropped as soon as the underlying log changes
+        version = self._log._state_version()
+        if version != self._log_version:
+            self._log_version = version
+            self.clear_cache()
+        return super(_TraceLogView, self)._memoize(key, parameterized, compute)
+
+    def encode(self, trace):
+        return self._log.encode(trace)
+
+    def encoded_variants(self):
+        log = self._log
+        for vid in self._vids:
+            key = log._variant_key(vid)
+            if key is not None:
+                yield log._encoded(key), log[key]
+
+    def _root(self):
+        return self._log
+
+    def _selection(self):
+        return self._selected
+
+
+def _xes_trace_ranges(filepath, n_chunks, block_size=1 << 16):
+    """Splits an uncompressed XES file at `<trace>` boundaries, the tag
+    possibly with a namespace prefix (e.g. `<xes:trace>`).
+
+    Returns the header of the document (everything preceding the first trace),
+    its footer (everything following the last trace) and a list of
+    `(start, end)` byte ranges, each one holding whole traces.
+    """
+    import re
+
+    pattern = re.compile(rb"<(?:[\w.-]+:)?trace[\s>/]")
+
+    with open(filepath, "rb") as f:
+        size = f.seek(0, 2)
+
+        def find_trace(offset):
+            """Returns the offset of the first trace starting at or after offset."""
+            f.seek(offset)
+            carry = b""
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    return None
+                data = carry + block
+                match = pattern.search(data)
+                if match is not None:
+                    return offset - len(carry) + match.start()
+                # Keep enough of the block for a tag split across blocks
+                carry = data[-64:]
+                offset += len(block)
+
+        first = find_trace(0)
+        if first is None:
+            return None, None, []
+
+        f.seek(0)
+        header = f.read(first)
+
+        # The footer holds the closing tag of the log element
+        f.seek(max(first, size - block_size))
+        tail = f.read()
+        end = tail.rfind(b"</")
+        footer = tail[end:] if end >= 0 else b""
+        end = size - len(footer)
+
+        bounds = [first]
+        for i in range(1, n_chunks):
+            offset = find_trace(first + (end - first) * i // n_chunks)
+            if offset is not None and bounds[-1] < offset < end:
+                bounds.append(offset)
+        bounds.append(end)
+
+    return header, footer, list(zip(bounds, bounds[1:]))
+
+
+def _parse_xes_range(filepath, header, footer, start, end):
+    """Parses the traces of a byte range of a XES file, see `_xes_trace_ranges`."""
+    from io import BytesIO
+
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        chunk = f.read(end - start)
+
+    return TraceLog._parse_xes(BytesIO(header + chunk + footer))
+
+
+def _parse_xes_parallel(filepath, processes):
+    """Parses an uncompressed XES file in a pool of processes and returns the
+    merged mapping from trace to frequency.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    # A few chunks per process balance traces of uneven length
+    header, footer, ranges = _xes_trace_ranges(filepath, processes * 4)
+    if not ranges:
+        # No trace boundary found, let the parser make sense of the file
+        return TraceLog._parse_xes(filepath)
+    tracelog = dict()
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_parse_xes_range, filepath, header, footer, start, end)
+            for start, end in ranges
+        ]
+        for future in futures:
+            for trace, freq in future.result().items():
+                if trace not in tracelog:
+                    tracelog[trace] = 0
+                tracelog[trace] += freq
+
+    return tracelog
+
+
+def _csv_columns(header, columns):
+    """Returns the indices of columns, given by index or by name in the header."""
+    indices = list()
+    for column in columns:
+        if column is None or isinstance(column, int):
+            indices.append(column)
+        elif header is not None and column in header:
+            indices.append(header.index(column))
+        else:
+            raise IllegalLogAction("No column {} in the CSV file.".format(column))
+
+    return indices
+
+
+def _read_csv_events(rows, case, activity, timestamp, sorted_by_case, parse_timestamp):
+    """Groups the events of CSV rows by case, given the indices of the columns.
+
+    If the rows are sorted by case, returns the mapping from trace to
+    frequency of the cases, except the first and the last ones, which may
+    continue in neighbouring rows, returned apart as (case, activities)
+    pairs (the last one None if there is a single case). Otherwise returns
+    the mapping from case to its events, (timestamp, activity) pairs
+    if the timestamp column is given, activities otherwise.
+    """
+    labels = dict()
+
+    if sorted_by_case:
+        counts = dict()
+        head = None
+        current = None
+        events = None
+        for row in rows:
+            if not row:
+                continue
+            if row[case] != current:
+                if events is not None:
+                    if head is None:
+                        head = (current, events)
+                    else:
+                        trace = tuple(events)
+                        counts[trace] = counts.get(trace, 0) + 1
+                current = row[case]
+                events = list()
+            events.append(labels.setdefault(row[activity], row[activity]))
+
+        tail = None if events is None else (current, events)
+        if head is None:
+            head, tail = tail, None
+        return counts, head, tail
+
+    cases = dict()
+    for row in rows:
+        if not row:
+            continue
+        event = labels.setdefault(row[activity], row[activity])
+        if timestamp is not None:
+            time = row[timestamp] if parse_timestamp is None else parse_timestamp(row[timestamp])
+            event = (time, event)
+        events = cases.get(row[case])
+        if events is None:
+            events = list()
+            cases[row[case]] = events
+        events.append(event)
+
+    return cases
+
+
+def _fold_csv_events(parts, sorted_by_case, timed):
+    """Merges the events grouped by `_read_csv_events`, from consecutive parts
+    of a CSV file, and returns the mapping from trace to frequency.
+    """
+    counts = dict()
+
+    def fold(events):
+        trace = tuple(events)
+        counts[trace] = counts.get(trace, 0) + 1
+
+    if sorted_by_case:
+        # The case ending a part may go on in the next ones
+        pending = None
+        for part_counts, head, tail in parts:
+            for trace, freq in part_counts.items():
+                counts[trace] = counts.get(trace, 0) + freq
+            if head is not None:
+                if pending is not None and pending[0] == head[0]:
+                    pending[1].extend(head[1])
+                else:
+                    if pending is not None:
+                        fold(pending[1])
+                    pending = head
+            if tail is not None:
+                fold(pending[1])
+                pending = tail
+        if pending is not None:
+            fold(pending[1])
+
+        return counts
+
+    cases = parts[0]
+    for part in parts[1:]:
+        for key, events in part.items():
+            if key in cases:
+                cases[key].extend(events)
+            else:
+                cases[key] = events
+
+    for events in cases.values():
+        if timed:
+            events.sort(key=lambda event: event[0])
+            events = [a for _, a in events]
+        fold(events)
+
+    return counts
+
+
+def _csv_line_ranges(filepath, start, n_chunks):
+    """Splits an uncompressed file, from offset start, in byte ranges of whole lines."""
+    with open(filepath, "rb") as f:
+        size = f.seek(0, 2)
+        bounds = [start]
+        for i in range(1, n_chunks):
+            f.seek(start + (size - start) * i // n_chunks)
+            f.readline()
+            offset = f.tell()
+            if bounds[-1] < offset < size:
+                bounds.append(offset)
+        bounds.append(size)
+
+    return list(zip(bounds, bounds[1:]))
+
+
+def _parse_csv_range(filepath, start, end, encoding, delimiter, *args):
+    """Groups the events of a byte range of a CSV file, see `_read_csv_events`."""
+    import csv
+    from io import StringIO
+
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        chunk = f.read(end - start).decode(encoding)
+
+    rows = csv.reader(StringIO(chunk, newline=""), delimiter=delimiter)
+    return _read_csv_events(rows, *args)
+
+
+def _write_txt(log, f, chunk_size):
+    """Writes the traces of a log, as `.txt` lines, to a binary file in chunks."""
+    chunk = list()
+    size = 0
+    for i, (trace, freq) in enumerate(log.items()):
+        line = "{}x Case{} {}\n".format(freq, i, " ".join(trace))
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            f.write("".join(chunk).encode("utf-8"))
+            chunk = list()
+            size = 0
+
+    f.write("".join(chunk).encode("utf-8"))
+
+
+def _write_xes(log, f):
+    """Writes the traces of a log, as a XES document, to a binary file."""
+    from lxml import etree
+
+    case = 0
+    with etree.xmlfile(f, encoding="utf-8") as xf:
+        xf.write_declaration()
+        with xf.element("log", {"xes.version": "1.0"}, nsmap={None: _XES_NAMESPACE}):
+            xf.write(etree.Element("extension", {
+                "name": "Concept",
+                "prefix": "concept",
+                "uri": "http://www.xes-standard.org/concept.xesext",
+            }))
+            xf.write(etree.Element("classifier", {"name": "Event Name", "keys": "concept:name"}))
+
+            for trace, freq in log.items():
+                elem = etree.Element("trace")
+                name = etree.SubElement(elem, "string", {"key": "concept:name"})
+                for activity in trace:
+                    event = etree.SubElement(elem, "event")
+                    etree.SubElement(event, "string", {"key": "concept:name", "value": activity})
+
+                # Every occurrence of the trace is a case of its own
+                for _ in range(int(freq)):
+                    name.set("value", "Case{}".format(case))
+                    xf.write(elem, "\n")
+                    case += 1
+
+
+register_importer((".xes", ".gz", ".xz"), TraceLog.from_xes)
+register_importer((".txt", ".txt.gz", ".txt.xz"), TraceLog.from_txt)
+register_importer((".csv", ".csv.gz", ".csv.xz"), TraceLog.from_csv)
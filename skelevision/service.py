@@ -0,0 +1,223 @@
+"""Asyncio service checking finished cases against a log skeleton.
+
+Clients connect over a localhost TCP or a Unix socket and send one JSON
+object per line:
+
+- `{"id": <case id>, "trace": [<activity>, ...]}` is answered with
+  `{"id": <case id>, "violations": <number>, "details": [[<relationship>, <a>, <b>], ...]}`,
+- `{"command": "reload", "path": <path>}` swaps in the skeleton saved at path
+  (see `LogSkeleton.save`) and is answered with `{"reloaded": <path>}`.
+
+Verdicts are written back in the order of the requests. The requests
+received while a batch is being checked are checked together as the
+next batch. A request line longer than the limit is skipped and answered
+with `{"error": <message>}`, as any invalid request.
+
+Run it with::
+
+    python -m skelevision.service skeleton.jsonl --port 8765
+    python -m skelevision.service skeleton.jsonl --unix /tmp/skelevision.sock
+"""
+import argparse
+import asyncio
+import json
+import signal
+
+from .conformance import ConformanceChecker
+from .miners import LogSkeleton
+
+
+class ConformanceService(object):
+    """Serves the conformance checking of traces against a log skeleton.
+
+    Parameters
+    ----------
+    skeleton: `dict`
+        mapping of the strings "relationships" and "statistics" to corresponding
+        dict of relationships and statistics, as returned by `LogSkeleton.mine`
+    batch_size: `int`
+        maximal number of requests checked together
+    limit: `int`
+        maximal length of a request line, in bytes (the buffer limit of the
+        `asyncio` streams), default 16 MiB
+    """
+
+    def __init__(self, skeleton, batch_size=1024, limit=1 << 24):
+        self.checker = ConformanceChecker(skeleton)
+        self.batch_size = batch_size
+        self.limit = limit
+
+    def load_skeleton(self, skeleton):
+        """Swaps the skeleton traces are checked against. The batches being
+        checked finish with the previous one, connections are kept open.
+        """
+        self.checker = ConformanceChecker(skeleton)
+
+    def reload(self, filepath):
+        """Swaps in the skeleton saved at filepath, see `load_skeleton`."""
+        self.load_skeleton(LogSkeleton.load(filepath))
+
+    async def reload_async(self, filepath):
+        """Swaps in the skeleton saved at filepath, reading and compiling it
+        in the default executor, so that the connections are still served
+        meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        self.checker = await loop.run_in_executor(None, _load_checker, filepath)
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """Starts listening, on a Unix socket if path is given, otherwise
+        on a TCP socket, and returns the `asyncio` server.
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle, path=path, limit=self.limit)
+        return await asyncio.start_server(self._handle, host=host, port=port, limit=self.limit)
+
+    async def _readline(self, reader):
+        """Returns the next line of a connection, b"" at its end, or a
+        `ValueError` if the line is longer than the limit (the line is
+        then skipped).
+        """
+        overlong = False
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                # Last line, without a newline
+                line = e.partial
+            except asyncio.LimitOverrunError as e:
+                # Drop the buffered part of the line, until its end
+                await reader.readexactly(e.consumed)
+                overlong = True
+                continue
+
+            if overlong:
+                return ValueError("Request line longer than {} bytes.".format(self.limit))
+            return line
+
+    async def _handle(self, reader, writer):
+        """Serves a single connection."""
+        # Bounded, so that a client not reading its responses stops being read
+        queue = asyncio.Queue(maxsize=2 * self.batch_size)
+        responder = asyncio.ensure_future(self._respond(queue, writer))
+
+        try:
+            while True:
+                try:
+                    line = await self._readline(reader)
+                except ConnectionError:
+                    break
+                if isinstance(line, ValueError):
+                    await queue.put(line)
+                elif not line:
+                    break
+                elif line.strip():
+                    await queue.put(line)
+        finally:
+            await queue.put(None)
+            await responder
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, queue, writer):
+        """Checks the queued requests of a connection in batches and writes
+        back their responses. Once the connection is lost, the requests are
+        still taken from the queue, not to block the reading side.
+        """
+        connected = True
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+
+            if connected:
+                writer.write(b"".join(await self._process(batch)))
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    connected = False
+
+            if done:
+                return
+
+    async def _process(self, batch):
+        """Returns the encoded responses to a batch of request lines (or of
+        the errors raised reading them).
+        """
+        checker = self.checker
+        responses = list()
+
+        for line in batch:
+            try:
+                if isinstance(line, Exception):
+                    raise line
+                request = json.loads(line)
+                if "command" in request:
+                    response = await self._command(request)
+                    checker = self.checker
+                else:
+                    details = checker.violations(request["trace"])
+                    response = {
+                        "id": request.get("id"),
+                        "violations": len(details),
+                        "details": details,
+                    }
+            except Exception as e:
+                response = {"error": "{}: {}".format(type(e).__name__, e)}
+            responses.append(json.dumps(response).encode("utf-8") + b"\n")
+
+        return responses
+
+    async def _command(self, request):
+        """Executes a control request."""
+        if request["command"] == "reload":
+            await self.reload_async(request["path"])
+            return {"reloaded": request["path"]}
+        raise ValueError("Unknown command {}.".format(request["command"]))
+
+
+def _load_checker(filepath):
+    """Returns a checker for the skeleton saved at filepath."""
+    return ConformanceChecker(LogSkeleton.load(filepath))
+
+
+async def _serve(args):
+    service = ConformanceService(
+        LogSkeleton.load(args.skeleton), batch_size=args.batch_size, limit=args.limit
+    )
+    server = await service.start(host=args.host, port=args.port, path=args.unix)
+
+    # SIGHUP reloads the skeleton from its file
+    loop = asyncio.get_running_loop()
+    if hasattr(signal, "SIGHUP"):
+        loop.add_signal_handler(
+            signal.SIGHUP, lambda: asyncio.ensure_future(service.reload_async(args.skeleton))
+        )
+
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cases against a log skeleton.")
+    parser.add_argument("skeleton", help="skeleton saved with LogSkeleton.save")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket to listen on")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--limit", type=int, default=1 << 24,
+                        help="maximal length of a request line, in bytes")
+    args = parser.parse_args(argv)
+
+    asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+from .objects import TraceLog
+
+
+class EventStreamBuilder(object):
+    """Builds a `TraceLog` from an interleaved stream of events, each one a
+    (case id, activity, timestamp) triple, in bounded memory.
+
+    Only the cases still open are buffered, in a table ordered from the least
+    to the most recently active one. A case is closed, and its trace folded
+    into the variant counts, when:
+
+    - its activity is the end marker (`"end"`),
+    - it has been inactive for longer than the timeout (`"timeout"`), the
+      stream time being the latest timestamp seen,
+    - the table exceeds its limits, the least recently active cases being
+      evicted first (`"evicted"`),
+    - the builder is flushed (`"flushed"`).
+
+    Timeouts expect the events to arrive roughly in the order of their
+    timestamps: the cases are checked from the least recently timestamped
+    one. A case none of whose events has a timestamp never times out.
+
+    Parameters
+    ----------
+    end: `str`
+        activity closing its case, default None thus none
+    timeout:
+        inactivity after which a case is closed, of a type which can be
+        subtracted from the timestamps (e.g. seconds or `datetime.timedelta`),
+        default None thus never
+    max_open_cases: `int`
+        maximal number of open cases, default None thus unbounded
+    max_open_events: `int`
+        maximal number of events of the open cases, default None thus unbounded
+    fold_evicted: `bool`
+        If False, the traces of the evicted cases, which may be incomplete,
+        are dropped instead of folded.
+    on_close: callable
+        Called as `on_close(case, trace, reason)` for every closed case.
+    """
+
+    def __init__(self, end=None, timeout=None, max_open_cases=None, max_open_events=None,
+                 fold_evicted=True, on_close=None):
+        self.end = end
+        self.timeout = timeout
+        self.max_open_cases = max_open_cases
+        self.max_open_events = max_open_events
+        self.fold_evicted = fold_evicted
+        self.on_close = on_close
+
+        # Case id to its activities and latest timestamp, least recently active first
+        self.open_cases = OrderedDict()
+        # Case id to its latest timestamp, least recently timestamped first,
+        # only for the open cases with some timestamp
+        self._timed = OrderedDict()
+        self.open_events = 0
+        self.now = None
+        # Trace to frequency of the closed cases
+        self.counts = dict()
+        # Number of closed cases per reason
+        self.closed = {"end": 0, "timeout": 0, "evicted": 0, "flushed": 0}
+        # Every label is kept once, shared by all the traces
+        self._labels = dict()
+
+    def add(self, case, activity, timestamp=None):
+        """Adds a single event to the open case it belongs to."""
+        if timestamp is not None and (self.now is None or timestamp > self.now):
+            self.now = timestamp
+            if self.timeout is not None:
+                self.expire()
+
+        activity = self._labels.setdefault(activity, activity)
+        entry = self.open_cases.get(case)
+        if entry is None:
+            entry = [[], timestamp]
+            self.open_cases[case] = entry
+        else:
+            self.open_cases.move_to_end(case)
+        entry[0].append(activity)
+        if timestamp is not None:
+            entry[1] = timestamp
+            self._timed[case] = timestamp
+            self._timed.move_to_end(case)
+        self.open_events += 1
+
+        if activity == self.end:
+            self._close(case, "end")
+
+        self._evict()
+
+    def update(self, events):
+        """Adds (case id, activity, timestamp) triples, see `add`.
+
+        Returns
+        -------
+        `EventStreamBuilder`
+            the builder itself
+        """
+        add = self.add
+        for case, activity, timestamp in events:
+            add(case, activity, timestamp)
+
+        return self
+
+    def expire(self, now=None):
+        """Closes the cases inactive for longer than the timeout, at the given
+        stream time, default the latest timestamp seen.
+        """
+        now = self.now if now is None else now
+        if self.timeout is None or now is None:
+            return
+
+        limit = now - self.timeout
+        while self._timed:
+            case, last = next(iter(self._timed.items()))
+            if last >= limit:
+                break
+            self._close(case, "timeout")
+
+    def flush(self):
+        """Closes all the open cases."""
+        while self.open_cases:
+            self._close(next(iter(self.open_cases)), "flushed")
+
+    def to_log(self, flush=True):
+        """Returns a `TraceLog` of the closed cases.
+
+        Parameters
+        ----------
+        flush: `bool`
+            If True, the open cases are closed first.
+        """
+        if flush:
+            self.flush()
+        return TraceLog.from_counts(self.counts)
+
+    def _evict(self):
+        """Evicts the least recently active cases until the limits hold."""
+        while self.open_cases and (
+            (self.max_open_cases is not None and len(self.open_cases) > self.max_open_cases)
+            or (self.max_open_events is not None and self.open_events > self.max_open_events)
+        ):
+            self._close(next(iter(self.open_cases)), "evicted")
+
+    def _close(self, case, reason):
+        """Closes an open case, folding its trace into the counts."""
+        activities, _ = self.open_cases.pop(case)
+        self._timed.pop(case, None)
+        self.open_events -= len(activities)
+        self.closed[reason] += 1
+
+        trace = tuple(activities)
+        if reason != "evicted" or self.fold_evicted:
+            self.counts[trace] = self.counts.get(trace, 0) + 1
+        if self.on_close is not None:
+            self.on_close(case, trace, reason)
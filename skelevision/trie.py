@@ -0,0 +1,292 @@
+from array import array
+
+from .engine import _candidate_pairs
+from .utils import _validate_distance
+
+
+class VariantTrie(object):
+    """Prefix tree of the (integer encoded) variants of a trace log.
+
+    Every node stands for the prefix spelled by the activities on its path
+    from the root and holds the id of its activity, whether a variant ends
+    there and its frequency. Variants sharing a prefix share its nodes, so that
+    the relationships and statistics below are computed once per node,
+    instead of once per event of every variant: directly-follows counts and
+    sums from the number of traces through every node, the per trace counts
+    and the activities before every last occurrence (always-before)
+    incrementally along a depth-first traversal. Always-after depends on
+    what follows a first occurrence, which is not shared, and is computed by
+    walking every variant back from its end.
+
+    Nodes are kept in flat arrays, indexed by node id, a node always being
+    created after its parent (the root is node 0).
+
+    Parameters
+    ----------
+    activity_names: `list` of `str`
+        the activity labels, indexed by their integer id
+        (see `TraceLog.activity_names`)
+    start: `str`
+        label of the artificial start activity
+    end: `str`
+        label of the artificial end activity
+    """
+
+    def __init__(self, activity_names, start="[>", end="[]"):
+        self.activity_names = activity_names
+        self.start = start
+        self.end = end
+        self.n_variants = 0
+        self.parent = array("i", [-1])
+        self.activity = array("i", [-1])
+        self.depth = array("i", [0])
+        self.frequency = array("q", [0])
+        # Frequencies may be 0, the variants ending at a node are flagged apart
+        self.terminal = array("b", [0])
+        # Children as linked lists, and the edges for the lookups on insertion
+        self.first_child = array("i", [-1])
+        self.next_sibling = array("i", [-1])
+        self.edges = dict()
+
+    @staticmethod
+    def from_log(log):
+        """Returns the trie of the variants of a `TraceLog`, sharing its activity labels."""
+        trie = VariantTrie(log.activity_names)
+        for variant, freq in log.encoded_variants():
+            trie.add(variant, freq)
+
+        return trie
+
+    def __len__(self):
+        """Returns the number of nodes, the root included."""
+        return len(self.parent)
+
+    def add(self, variant, freq):
+        """Adds an integer encoded variant, with its frequency.
+
+        Parameters
+        ----------
+        variant: sequence of `int`
+            a trace as a sequence of activity ids
+        freq: `int`
+            frequency of the trace
+        """
+        edges = self.edges
+        node = 0
+        for a in variant:
+            child = edges.get((node, a))
+            if child is None:
+                child = len(self.parent)
+                edges[(node, a)] = child
+                self.parent.append(node)
+                self.activity.append(a)
+                self.depth.append(self.depth[node] + 1)
+                self.frequency.append(0)
+                self.terminal.append(0)
+                self.first_child.append(-1)
+                self.next_sibling.append(self.first_child[node])
+                self.first_child[node] = child
+            node = child
+
+        if not self.terminal[node]:
+            self.terminal[node] = 1
+            self.n_variants += 1
+        self.frequency[node] += freq
+
+    def variants(self):
+        """Yields the pairs of integer encoded variants and frequencies."""
+        for node in range(len(self.parent)):
+            if self.terminal[node]:
+                yield self._prefix(node), self.frequency[node]
+
+    def _prefix(self, node):
+        """Returns the integer encoded prefix spelled by a node."""
+        prefix = array("i", [0] * self.depth[node])
+        while node > 0:
+            prefix[self.depth[node] - 1] = self.activity[node]
+            node = self.parent[node]
+
+        return prefix
+
+    def _weights(self):
+        """Returns, per node, the number of traces going through it."""
+        weight = array("q", self.frequency)
+        parent = self.parent
+        # Children are created after their parent
+        for node in range(len(weight) - 1, 0, -1):
+            weight[parent[node]] += weight[node]
+
+        return weight
+
+    def _present(self):
+        """Returns the bitmask of the activities occurring in the trie."""
+        present = 0
+        for a in set(self.activity[1:]):
+            present |= 1 << a
+
+        return present
+
+    def _ends(self):
+        """Traverses the trie depth-first and yields, at every node where
+        variants end, the node along with the live state of its variant:
+        mappings from the activity ids to their count, first and last
+        (0-based) position in it and to the bitmask of the activities
+        occurring before its last position. The state must not be modified.
+        """
+        counts = dict()
+        first = dict()
+        last = dict()
+        before = dict()
+        # Per depth, the bitmask of the activities of the prefix
+        prefixes = [0]
+
+        if self.terminal[0]:
+            yield 0, counts, first, last, before
+
+        # Entries >= 0 enter a node, entries < 0 leave node ~entry
+        stack = list()
+        child = self.first_child[0]
+        while child != -1:
+            stack.append(child)
+            child = self.next_sibling[child]
+        # The previous last position, and mask before it, of the activity
+        # of every node being visited
+        saved = dict()
+
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                node = ~node
+                a = self.activity[node]
+                counts[a] -= 1
+                if counts[a] == 0:
+                    del counts[a]
+                    del first[a]
+                    del last[a]
+                    del before[a]
+                else:
+                    last[a], before[a] = saved.pop(node)
+                continue
+
+            a = self.activity[node]
+            position = self.depth[node] - 1
+            if a in counts:
+                counts[a] += 1
+                saved[node] = (last[a], before[a])
+            else:
+                counts[a] = 1
+                first[a] = position
+            last[a] = position
+            before[a] = prefixes[position]
+            del prefixes[position + 1:]
+            prefixes.append(prefixes[position] | (1 << a))
+
+            if self.terminal[node]:
+                yield node, counts, first, last, before
+
+            stack.append(~node)
+            child = self.first_child[node]
+            while child != -1:
+                stack.append(child)
+                child = self.next_sibling[child]
+
+    def follows(self, distance=1):
+        """Returns a mapping from pairs of activities to frequency, see `TraceLog.follows`."""
+        _validate_distance(distance)
+        distance = int(distance)
+        names = self.activity_names
+        weight = self._weights()
+        parent = self.parent
+        depth = self.depth
+        activity = self.activity
+        pairs = dict()
+
+        for node in range(1, len(parent)):
+            if depth[node] <= distance:
+                continue
+            ancestor = node
+            for _ in range(distance):
+                ancestor = parent[ancestor]
+            p = (activity[ancestor], activity[node])
+            pairs[p] = pairs.get(p, 0) + weight[node]
+
+        return {(names[a], names[b]): freq for (a, b), freq in pairs.items()}
+
+    def sum_counter(self):
+        """Returns a mapping from activity to the number of times it occurs in the log."""
+        names = self.activity_names
+        weight = self._weights()
+        sum_c = dict()
+        for node in range(1, len(weight)):
+            a = self.activity[node]
+            sum_c[a] = sum_c.get(a, 0) + weight[node]
+
+        return {names[a]: c for a, c in sum_c.items()}
+
+    def statistics(self):
+        """Returns a mapping from activity to its sum, min and max number of
+        occurrences in a trace, see `TraceLog.statistics`.
+        """
+        names = self.activity_names
+        min_c = dict()
+        max_c = dict()
+        seen = dict()
+        for _, counts, _, _, _ in self._ends():
+            for a, c in counts.items():
+                if a not in seen:
+                    seen[a] = 0
+                    min_c[a] = c
+                    max_c[a] = c
+                seen[a] += 1
+                if c < min_c[a]:
+                    min_c[a] = c
+                if c > max_c[a]:
+                    max_c[a] = c
+
+        sum_c = self.sum_counter()
+        label_2_stats = dict()
+        for a in sorted(seen, key=names.__getitem__):
+            label_2_stats[names[a]] = {
+                "sum": sum_c[names[a]],
+                # An activity missing from any variant occurs there 0 times
+                "min": min_c[a] if seen[a] == self.n_variants else 0,
+                "max": max_c[a],
+            }
+
+        return label_2_stats
+
+    def always_after(self):
+        """Returns the pairs (a, b) such that b always occurs after a, see `TraceLog.always_after`."""
+        parent = self.parent
+        depth = self.depth
+        activity = self.activity
+        candidates = [None] * len(self.activity_names)
+
+        for node, _, first, _, _ in self._ends():
+            # What follows a position is a suffix of the variant, which is
+            # not shared: walk it back from the end of the variant
+            first_at = {p: a for a, p in first.items()}
+            mask = 0
+            while node > 0:
+                a = first_at.get(depth[node] - 1)
+                if a is not None and mask:
+                    candidates[a] = mask if candidates[a] is None else candidates[a] & mask
+                mask |= 1 << activity[node]
+                node = parent[node]
+
+        return _candidate_pairs(
+            candidates, self.activity_names, self.end, self.start, self._present()
+        )
+
+    def always_before(self):
+        """Returns the pairs (a, b) such that b always occurs before a, see `TraceLog.always_before`."""
+        candidates = [None] * len(self.activity_names)
+        for _, _, _, _, before in self._ends():
+            for a, mask in before.items():
+                if mask:
+                    candidates[a] = mask if candidates[a] is None else candidates[a] & mask
+
+        return _candidate_pairs(
+            candidates, self.activity_names, self.start, self.end, self._present()
+        )
+
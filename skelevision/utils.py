@@ -1,6 +1,17 @@
-from itertools import combinations
+from collections import Counter
+from itertools import chain, combinations, islice, repeat
+from operator import add
 from sortedcontainers import SortedSet
 
+__all__ = ["follows", "successors", "predecessors", "fast_successors", "fast_predecessors"]
+
+def _validate_distance(distance):
+    """Raises a `ValueError` if distance is not an integer greater or equal to 1."""
+    if not float(distance).is_integer():
+        raise ValueError("Distance has to be an integer.")
+    if not distance >= 1:
+        raise ValueError("Distance has to be greater or equal to 1.")
+
 def follows(trace, distance=1):
     """Returns a mapping (aka. dict) from pairs of activities to frequency.
     A pair (a, b) is part of the mapping if activity b directly follows activity a,
@@ -14,10 +25,7 @@ def follows(trace, distance=1):
 
     if not isinstance(trace, tuple):
         raise ValueError("Trace has to be a tuple of activities.")
-    if not float(distance).is_integer():
-        raise ValueError("Distance has to be an integer.")
-    if not distance >= 1:
-        raise ValueError("Distance has to be greater or equal to 1.")
+    _validate_distance(distance)
 
     pairs = dict()
 
@@ -81,4 +89,148 @@ def predecessors(trace):
     if not isinstance(trace, tuple):
         raise ValueError("Trace has to be a tuple of activities.")
 
-    return successors(tuple(reversed(trace)))
\ No newline at end of file
+    return successors(tuple(reversed(trace)))
+
+def fast_successors(trace):
+    """Returns the same mapping as `successors`, computed in time linear in the
+    length of the trace: activity b follows activity a if the last occurrence
+    of b comes after the first occurrence of a.
+
+    Parameters
+    ----------
+    trace: `tuple`
+        a trace as a tuple of activities
+
+    Returns
+    -------
+    `dict`
+        mapping from activity to the `SortedSet` of activities which follow it
+    """
+
+    if not isinstance(trace, tuple):
+        raise ValueError("Trace has to be a tuple of activities.")
+
+    first = dict()
+    for i, a in enumerate(trace):
+        if a not in first:
+            first[a] = i
+
+    s = dict()
+    seen = set()
+
+    for i in range(len(trace) - 1, -1, -1):
+        a = trace[i]
+        if first[a] == i and seen:
+            s[a] = SortedSet(seen)
+        seen.add(a)
+
+    return s
+
+def fast_predecessors(trace):
+    """Returns the same mapping as `predecessors`, computed in time linear in the
+    length of the trace.
+
+    Parameters
+    ----------
+    trace: `tuple`
+        a trace as a tuple of activities
+
+    Returns
+    -------
+    `dict`
+        mapping from activity to the `SortedSet` of activities which precede it
+    """
+
+    if not isinstance(trace, tuple):
+        raise ValueError("Trace has to be a tuple of activities.")
+
+    return fast_successors(tuple(reversed(trace)))
+
+def _successor_masks(variant):
+    """For an integer encoded trace, returns a mapping from each activity id,
+    which is not only the last activity, to the bitmask of the activities
+    occurring after its first occurrence.
+    """
+    first = dict()
+    for i, a in enumerate(variant):
+        if a not in first:
+            first[a] = i
+
+    masks = dict()
+    suffix = 0
+    for i in range(len(variant) - 1, -1, -1):
+        a = variant[i]
+        if first[a] == i and suffix:
+            masks[a] = suffix
+        suffix |= 1 << a
+
+    return masks
+
+def _predecessor_masks(variant):
+    """For an integer encoded trace, returns a mapping from each activity id,
+    which is not only the first activity, to the bitmask of the activities
+    occurring before its last occurrence.
+    """
+    last = dict()
+    for i, a in enumerate(variant):
+        last[a] = i
+
+    masks = dict()
+    prefix = 0
+    for i, a in enumerate(variant):
+        if last[a] == i and prefix:
+            masks[a] = prefix
+        prefix |= 1 << a
+
+    return masks
+
+def _follows_profile(variants, n_labels, max_distance, eventually=True):
+    """For pairs of integer encoded traces and frequencies, returns the
+    frequencies of the pairs of activities (a, b), coded as `a * n_labels + b`,
+    at every distance up to max_distance, as a list of dicts indexed by the
+    distance minus 1, and at any distance (eventually-follows), as a dict,
+    or None if eventually is False.
+
+    The codes of the pairs are computed and counted at C speed (`map` and
+    `Counter.update`), the pairs up to max_distance offset by their distance
+    so that a single counter holds all of them. The counters are shared by
+    the traces of the same frequency, which are only weighted by it at the end.
+    """
+    n_pairs = n_labels * n_labels
+    # Frequency to the counters of the pairs up to max_distance and at any distance
+    counters = dict()
+
+    for variant, freq in variants:
+        if freq not in counters:
+            counters[freq] = (Counter(), Counter())
+        near, anywhere = counters[freq]
+        scaled = [a * n_labels for a in variant]
+
+        near.update(chain.from_iterable(
+            map(add, map(add, scaled, repeat((d - 1) * n_pairs)), islice(variant, d, None))
+            for d in range(1, min(max_distance, len(scaled) - 1) + 1)
+        ))
+        if eventually:
+            anywhere.update(chain.from_iterable(
+                map(add, scaled, islice(variant, d, None))
+                for d in range(1, len(scaled))
+            ))
+
+    by_distance = [dict() for _ in range(max_distance)]
+    by_code = dict()
+    for freq, (near, anywhere) in counters.items():
+        for code, c in near.items():
+            d, code = divmod(code, n_pairs)
+            pairs = by_distance[d]
+            pairs[code] = pairs.get(code, 0) + c * freq
+        for code, c in anywhere.items():
+            by_code[code] = by_code.get(code, 0) + c * freq
+
+    return by_distance, by_code if eventually else None
+
+def _iter_bits(mask):
+    """Yields the positions of the set bits of an integer bitmask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from skelevision import ConformanceChecker, LogSkeleton, TraceLog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "datasets")
+
+
+class TestConformanceChecker(object):
+    @pytest.mark.parametrize("name", ["L1.txt", "L2.txt", "L4.txt"])
+    def test_mined_log_conforms(self, name):
+        tl = TraceLog.from_txt(os.path.join(DATA, name)).augment()
+        checker = ConformanceChecker(LogSkeleton.mine(tl, {}, {}))
+
+        assert all(v == [] for v in checker.check(tl).values())
+        assert checker.check(list(tl), details=False) == [0] * len(tl)
+
+    def test_violations(self):
+        tl = TraceLog({("a", "b", "c"): 2, ("a", "c", "b"): 1, ("a", "d"): 1})
+        checker = ConformanceChecker(LogSkeleton.mine(tl, {}, {}))
+
+        assert set(checker.violations(("a", "c", "d", "x"))) == {
+            ("unknown", "x", None),
+            ("equivalence", "b", "c"),
+            ("alwaysAfter", "c", "b"),
+            # d is not the last activity, x follows it
+            ("alwaysAfter", "d", "a"),
+            ("alwaysAfter", "d", "b"),
+            ("alwaysAfter", "d", "c"),
+            ("neverTogether", "c", "d"),
+            ("dependency", "c", "d"),
+        }
+        assert set(checker.violations(("b", "a"))) == {
+            ("equivalence", "b", "c"),
+            ("alwaysAfter", "b", "c"),
+            ("alwaysBefore", "a", "c"),
+            ("alwaysBefore", "a", "d"),
+            ("dependency", "b", "a"),
+        }
+        assert set(checker.violations(("[>", "a", "b", "c", "[]"))) >= {
+            ("unknown", "[>", None),
+            ("unknown", "[]", None),
+        }
+
+    def test_unknown_activity_kept_in_place(self):
+        checker = ConformanceChecker(LogSkeleton.mine(TraceLog({("e",): 1}).augment(), {}, {}))
+
+        # z separates the occurrences of e, which are thus not adjacent
+        assert set(checker.violations(("[>", "e", "z", "e", "[]"))) == {
+            ("unknown", "z", None),
+            ("count", "e", None),
+            ("equivalence", "[>", "e"),
+            ("equivalence", "[]", "e"),
+        }
+
+        tl = TraceLog({("a", "b", "c"): 1, ("a", "c", "b"): 1}).augment()
+        checker = ConformanceChecker(LogSkeleton.mine(tl, {}, {}))
+        assert set(checker.violations(("[>", "a", "b", "z", "c", "[]"))) == {
+            ("unknown", "z", None),
+        }
+        # b is not the last activity, z follows it
+        assert ("alwaysAfter", "b", "[]") in checker.violations(("[>", "a", "c", "b", "z"))
+
+    def test_equivalence(self):
+        tl = TraceLog({("a", "b", "c"): 1, ("a", "b", "c", "b", "c"): 1, ("a",): 1})
+        skeleton = LogSkeleton.mine(tl, {}, {})
+        assert ("b", "c") in skeleton["relationships"]["equivalence"]
+        checker = ConformanceChecker(skeleton)
+
+        assert ("equivalence", "b", "c") in checker.violations(("a", "b", "c", "b"))
+        assert ("equivalence", "b", "c") in checker.violations(("a", "c"))
+
+    def test_from_file(self, tmp_path):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt")).augment()
+        filepath = str(tmp_path / "L2.skeleton")
+        LogSkeleton.save(LogSkeleton.mine(tl, {}, {}), filepath)
+
+        checker = ConformanceChecker.from_file(filepath)
+        assert checker.check(tl, details=False) == {trace: 0 for trace in tl}
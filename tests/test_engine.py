@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from skelevision import RelationEngine, TraceLog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "datasets")
+
+
+def symmetric(pairs):
+    return set(pairs) | set(p[::-1] for p in pairs)
+
+
+class TestRelationEngine(object):
+    @pytest.mark.parametrize("name", ["L1.txt", "L2.txt", "L4.txt"])
+    def test_matches_tracelog(self, name):
+        tl = TraceLog.from_txt(os.path.join(DATA, name)).augment()
+        engine = RelationEngine(tl.activity_names).update(tl.encoded_variants())
+
+        assert symmetric(engine.equivalence()) == symmetric(tl.equivalence())
+        assert engine.always_after() == tl.always_after()
+        assert engine.always_before() == tl.always_before()
+        assert engine.never_together() == tl.never_together()
+        assert engine.dependency() == set(tl.follows())
+        assert engine.link() == tl.follows()
+        assert engine.statistics() == tl.statistics()
+
+    def test_equivalence_counts(self):
+        tl = TraceLog({("a", "b", "c"): 1, ("a", "b", "b", "c"): 1, ("a", "c"): 2})
+        engine = RelationEngine(tl.activity_names).update(tl.encoded_variants())
+
+        assert engine.equivalence() == {("a", "c"), ("c", "a")}
+
+    def test_result(self):
+        tl = TraceLog({("a", "b"): 2, ("a", "c"): 1})
+        result = RelationEngine(tl.activity_names).update(tl.encoded_variants()).result()
+
+        assert result["relationships"]["neverTogether"] == {("b", "c")}
+        assert result["relationships"]["dependency"] == {("a", "b"), ("a", "c")}
+        assert result["statistics"]["link"] == {("a", "b"): 2, ("a", "c"): 1}
+        assert result["statistics"]["node"]["b"] == {"sum": 2, "min": 0, "max": 1}
+
+    def test_merge(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        traces = list(tl.items())
+        shards = [TraceLog(traces[:4]), TraceLog(traces[4:9]), TraceLog(traces[9:])]
+
+        partials = [
+            RelationEngine(list(s.activity_names)).update(s.encoded_variants())
+            for s in shards
+        ]
+        left = RelationEngine([]).merge(partials[0]).merge(partials[1]).merge(partials[2])
+        right = RelationEngine([]).merge(partials[2]).merge(partials[1]).merge(partials[0])
+
+        target = RelationEngine(tl.activity_names).update(tl.encoded_variants()).result()
+        assert left.result() == target
+        assert right.result() == target
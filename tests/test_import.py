@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# Seconds `import skelevision` may take
+IMPORT_BUDGET = 0.05
+
+
+def run_python(code):
+    """Runs code in a fresh interpreter and returns its output."""
+    env = dict(os.environ)
+    # Measure the import of the compiled modules, as installed
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return subprocess.check_output([sys.executable, "-c", code], cwd=ROOT, env=env).decode()
+
+
+class TestImport(object):
+    def test_import_time(self):
+        code = (
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import skelevision\n"
+            "print(time.perf_counter() - start)\n"
+        )
+        elapsed = min(float(run_python(code)) for _ in range(5))
+        assert elapsed < IMPORT_BUDGET
+
+    def test_lazy_dependencies(self):
+        code = (
+            "import sys\n"
+            "import skelevision\n"
+            "print(' '.join(sorted(sys.modules)))\n"
+        )
+        modules = run_python(code).split()
+        for name in ("lxml", "pm4py", "xml.etree.ElementTree", "concurrent.futures", "tracemalloc"):
+            assert name not in modules
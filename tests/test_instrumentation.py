@@ -0,0 +1,96 @@
+import json
+import os
+import tracemalloc
+
+from skelevision import Instrumentation, LogSkeleton, TraceLog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "datasets")
+
+
+class TestInstrumentation(object):
+    def test_mine_stages(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        sunk = list()
+        instrumentation = Instrumentation(trace_memory=True, sink=sunk.append)
+
+        result = LogSkeleton.mine(tl, {}, {}, instrumentation=instrumentation)
+
+        assert result == LogSkeleton.mine(tl, {}, {})
+        assert [r["stage"] for r in instrumentation.records] == [
+            "filter", "fold", "equivalence", "alwaysAfter", "alwaysBefore",
+            "neverTogether", "dependency", "node", "link",
+        ]
+        assert sunk == instrumentation.records
+        for record in instrumentation.records:
+            assert record["wall_seconds"] >= 0
+            assert record["cpu_seconds"] >= 0
+            if hasattr(tracemalloc, "reset_peak"):
+                assert record["peak_alloc_bytes"] >= 0
+        assert instrumentation.records[0]["variants"] == len(tl)
+        assert instrumentation.records[0]["labels"] == len(tl.labels)
+        assert instrumentation.records[1]["labels"] == len(tl.labels)
+
+    def test_importers(self):
+        instrumentation = Instrumentation()
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"), instrumentation=instrumentation)
+        TraceLog.from_xes(os.path.join(DATA, "L2.xes"), instrumentation=instrumentation)
+
+        txt, xes = instrumentation.records
+        assert txt["stage"] == "from_txt" and xes["stage"] == "from_xes"
+        assert txt["variants"] == len(tl)
+        assert txt["labels"] == len(tl.labels)
+        assert "peak_alloc_bytes" not in txt
+
+    def test_nested_stages_and_export(self):
+        instrumentation = Instrumentation(trace_memory=True)
+        with instrumentation.stage("outer"):
+            with instrumentation.stage("inner", variants=3):
+                data = [0] * 100000
+            del data
+
+        inner, outer = instrumentation.records
+        assert inner["variants"] == 3
+        if hasattr(tracemalloc, "reset_peak"):
+            assert outer["peak_alloc_bytes"] >= inner["peak_alloc_bytes"] > 0
+        else:
+            assert "peak_alloc_bytes" not in inner
+            assert outer["peak_alloc_bytes"] > 0
+
+        summary = instrumentation.summary()
+        assert summary["outer"]["count"] == 1 and summary["inner"]["count"] == 1
+
+        lines = instrumentation.to_json().splitlines()
+        assert [json.loads(line) for line in lines] == instrumentation.records
+
+        instrumentation.clear()
+        assert instrumentation.records == []
+        assert instrumentation.summary() == {}
+
+    def test_nested_peaks_without_reset(self, monkeypatch):
+        monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+        instrumentation = Instrumentation(trace_memory=True)
+        with instrumentation.stage("first"):
+            data = [0] * 100000
+        del data
+        with instrumentation.stage("outer"):
+            with instrumentation.stage("inner"):
+                pass
+
+        first, inner, outer = instrumentation.records
+        # The peak of the first stage cannot be inherited by the next ones
+        assert first["peak_alloc_bytes"] > 0
+        assert "peak_alloc_bytes" not in inner
+        assert outer["peak_alloc_bytes"] < first["peak_alloc_bytes"]
+
+    def test_sink_only(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        sunk = list()
+        instrumentation = Instrumentation(sink=sunk.append, keep_records=False)
+
+        LogSkeleton.mine(tl, {}, {}, instrumentation=instrumentation)
+        LogSkeleton.mine(tl, {}, {}, instrumentation=instrumentation)
+
+        assert instrumentation.records == []
+        assert len(sunk) == 18
+        assert instrumentation.summary()["fold"]["count"] == 2
@@ -1,9 +1,11 @@
 import os
 
+import pytest
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 DATA = os.path.join(HERE, "datasets")
 
-from skelevision import TraceLog, LogSkeleton
+from skelevision import IncrementalLogSkeleton, LogSkeleton, TraceLog
 
 
 class TestLogSkeleton(object):
@@ -150,3 +152,123 @@ class TestLogSkeleton(object):
 
         
 
+    def test_mine_single_pass(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        results = LogSkeleton.mine(tl, {"a1"}, {"a8"})
+
+        fl = tl.filter_traces({"a1"}, {"a8"})
+        relationships = results["relationships"]
+        assert relationships["alwaysAfter"] == fl.always_after()
+        assert relationships["alwaysBefore"] == fl.always_before()
+        assert relationships["neverTogether"] == fl.never_together()
+        assert relationships["dependency"] == set(fl.follows())
+        assert results["statistics"]["node"] == fl.statistics()
+        assert results["statistics"]["link"] == fl.follows()
+
+    @pytest.mark.parametrize("filename", ["L1.skeleton", "L1.skeleton.gz"])
+    def test_save_load(self, tmp_path, filename):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        results = LogSkeleton.mine(tl, {}, {})
+        filepath = str(tmp_path / filename)
+
+        LogSkeleton.save(results, filepath)
+        assert LogSkeleton.load(filepath) == results
+
+    def test_load_invalid_file(self):
+        with pytest.raises(ValueError):
+            LogSkeleton.load(os.path.join(DATA, "L1.txt"))
+
+    def test_mine_sharded(self, tmp_path):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        traces = list(tl.items())
+        shard = str(tmp_path / "shard.skvlog")
+        TraceLog(traces[7:]).save_binary(shard)
+
+        results = LogSkeleton.mine_sharded(
+            [TraceLog(traces[:3]), TraceLog(traces[3:7]), shard], {"a1"}, {"a8"}, max_workers=2
+        )
+        assert results == LogSkeleton.mine(tl, {"a1"}, {"a8"})
+
+        # In-memory shards alone need no worker process
+        results = LogSkeleton.mine_sharded(
+            [TraceLog(traces[:3]), TraceLog(traces[3:])], {"a1"}, {"a8"}, executor=object()
+        )
+        assert results == LogSkeleton.mine(tl, {"a1"}, {"a8"})
+
+    def test_mine_sample(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt")).augment()
+
+        # Drawing every variant gives the exact relationships
+        sampled = LogSkeleton.mine_sample(tl, {}, {}, sample_size=5000, seed=1)
+        full = LogSkeleton.mine(tl, {}, {})
+        assert sampled.exact
+        assert sampled.result["relationships"] == full["relationships"]
+        assert all(
+            c == 1.0 for pairs in sampled.confidence.values() for c in pairs.values()
+        )
+
+        sampled = LogSkeleton.mine_sample(tl, {}, {}, sample_size=3, seed=1)
+        again = LogSkeleton.mine_sample(tl, {}, {}, sample_size=3, seed=1)
+        assert sampled.result == again.result
+        assert not sampled.exact
+        assert sampled.sample_size == 3
+        for name, pairs in sampled.result["relationships"].items():
+            assert set(sampled.confidence[name]) == pairs
+            assert all(0 < c <= 1 for c in sampled.confidence[name].values())
+
+            report = sampled.verify()[name]
+            assert report["confirmed"] | report["spurious"] == pairs
+            assert report["confirmed"] | report["missed"] == full["relationships"][name]
+        assert sampled.verify() is sampled.verify()
+
+        node = sampled.result["statistics"]["node"]
+        assert sum(s["sum"] for s in node.values()) > 0
+
+    def test_mine_sample_empty(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt")).augment()
+        sampled = LogSkeleton.mine_sample(tl, {"z"}, {}, sample_size=10)
+
+        assert sampled.sample_size == 0
+        assert sampled.result["relationships"]["dependency"] == set()
+
+
+class TestIncrementalLogSkeleton(object):
+    def test_subscribed_log(self):
+        full = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        traces = list(full.items())
+
+        tl = TraceLog(traces[:5])
+        miner = IncrementalLogSkeleton({"a1"}, {"a7"})
+        miner.mine(tl)
+
+        for trace, freq in traces[5:]:
+            tl[trace] = freq
+        tl[traces[0][0]] += 3
+        assert miner.result() == LogSkeleton.mine(tl, {"a1"}, {"a7"})
+
+        del tl[traces[1][0]]
+        assert miner.result() == LogSkeleton.mine(tl, {"a1"}, {"a7"})
+
+        miner.close()
+        tl[("[>", "a1", "a9", "[]")] = 1
+        assert ("a1", "a9") not in miner.result()["relationships"]["dependency"]
+
+    def test_close_after_delete(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        miner = IncrementalLogSkeleton()
+        miner.mine(tl)
+
+        del tl[next(iter(tl))]
+        miner.close()
+        assert miner.result() == LogSkeleton.mine(tl, {}, {})
+
+    def test_update(self):
+        full = TraceLog.from_txt(os.path.join(DATA, "L2.txt")).augment()
+        traces = list(full.items())
+
+        miner = IncrementalLogSkeleton()
+        miner.update(dict(traces[:3])).update(traces[3:])
+        miner.update({traces[0][0]: 1})
+
+        full[traces[0][0]] += 1
+        assert miner.result() == LogSkeleton.mine(full, {}, {})
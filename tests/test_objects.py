@@ -1,8 +1,11 @@
 import os
+from array import array
+from collections import Counter
 
 import pytest
 
-from skelevision import TraceLog, IllegalLogAction
+from skelevision import TraceLog, IllegalLogAction, register_importer
+from skelevision.objects import _IMPORTERS
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 DATA = os.path.join(HERE, "datasets")
@@ -32,6 +35,34 @@ class TestTraceLog(object):
         for a in labels:
             assert a in tl.labels
 
+    def test_encode_decode(self):
+        d = {("a", "b", "c"): 2, ("a", "f"): 1}
+        tl = TraceLog(d)
+
+        assert tl.activity_names == ["a", "b", "c", "f"]
+        assert tl.activity_ids == {"a": 0, "b": 1, "c": 2, "f": 3}
+        assert list(tl.encode(("f", "a", "a"))) == [3, 0, 0]
+        assert tl.decode([3, 0, 0]) == ("f", "a", "a")
+
+        # Encoding is a lookup, unknown activities are not interned
+        with pytest.raises(IllegalLogAction):
+            tl.encode(("q",))
+        with pytest.raises(IllegalLogAction):
+            tl.filter_traces({"a"}).encode(("a", "q"))
+        assert "q" not in tl.activity_ids and "q" not in tl.labels
+        assert "q" not in tl.statistics()
+
+        tl[("g", "a")] = 1
+        assert tl.activity_ids["g"] == 4
+        assert "g" in tl.labels
+
+        variants = {tl.decode(v): f for v, f in tl.encoded_variants()}
+        assert variants == dict(tl)
+
+        del tl[("a", "f")]
+        variants = {tl.decode(v): f for v, f in tl.encoded_variants()}
+        assert variants == dict(tl)
+
     def test_follows(self):
         d = {("a", "b", "c"): 2, ("a", "f"): 1}
         s = {("a", "b"): 2, ("b", "c"): 2, ("a", "f"): 1}
@@ -211,6 +242,13 @@ class TestTraceLog(object):
         for el in R_eq:
             assert el in target or el[::-1] in target
 
+    def test_equivalence_count_vectors(self):
+        d = {("a", "b"): 1, ("a", "a", "b"): 1, ("c", "d", "c", "d"): 1, ("c", "d"): 2}
+        tl = TraceLog(d)
+        R_eq = tl.equivalence()
+
+        assert R_eq == {("c", "d"), ("d", "c")}
+
     def test_activity_2_freq(self):
         t = (
             "a1",
@@ -583,6 +621,15 @@ class TestTraceLog(object):
             assert a in count
             assert count[a] == f
     
+    def test_min_counter_missing_activity(self):
+        tl = TraceLog({("a", "b", "a"): 1, ("a", "a", "c"): 2, ("b",): 0})
+        assert tl.min_counter() == {"a": 0, "b": 0, "c": 0}
+
+        del tl[("b",)]
+        assert tl.min_counter() == {"a": 2, "b": 0, "c": 0}
+        assert tl.filter_traces({"c"}).min_counter() == {"a": 2, "c": 1}
+        assert TraceLog().min_counter() == {}
+
     def test_min_counter_L4(self):
         tl = TraceLog.from_txt(os.path.join(DATA, "L4.txt"))
         tl_aug = tl.augment()
@@ -651,4 +698,326 @@ class TestTraceLog(object):
             assert k, v in target
         
         for k, v in tl.items():
-            assert k, v in fa
\ No newline at end of file
+            assert k, v in fa
+
+    def test_never_together_stale_label(self):
+        d = {("a", "b"): 1, ("c",): 1, ("d", "c"): 1}
+        tl = TraceLog(d)
+        del tl[("d", "c")]
+
+        assert tl.never_together() == {("a", "c"), ("b", "c"), ("a", "d"), ("b", "d"), ("c", "d")}
+
+    def test_from_xes_parallel(self):
+        filepath = os.path.join(DATA, "L2.xes")
+        tl = TraceLog.from_xes(filepath, processes=2)
+
+        assert dict(tl) == dict(TraceLog.from_xes(filepath))
+
+    def test_from_xes_prefixed(self, tmp_path):
+        filepath = str(tmp_path / "prefixed.xes")
+        with open(filepath, "w") as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<xes:log xmlns:xes="http://www.xes-standard.org/">\n'
+                + "".join(
+                    '<xes:trace><xes:event><xes:string key="concept:name" value="{}"/>'
+                    "</xes:event></xes:trace>\n".format(a)
+                    for a in "ab"
+                )
+                + "</xes:log>\n"
+            )
+
+        expected = {("a",): 1, ("b",): 1}
+        assert dict(TraceLog.from_xes(filepath)) == expected
+        assert dict(TraceLog.from_xes(filepath, processes=2)) == expected
+
+    def test_save_load_binary(self, tmp_path):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        filepath = str(tmp_path / "L1.skvlog")
+        tl.save_binary(filepath)
+
+        # Relationships are computed before the traces are ever built
+        loaded = TraceLog.load_binary(filepath)
+        assert len(loaded) == len(tl)
+        assert list(loaded.labels) == list(tl.labels)
+        assert loaded.activity_names == tl.activity_names
+        assert loaded.always_after() == tl.always_after()
+        assert loaded.statistics() == tl.statistics()
+        assert dict(loaded) == dict(tl)
+
+        loaded = TraceLog.load_binary(filepath)
+        assert dict(loaded.filter_traces({"a3"}, {"a8"})) == dict(tl.filter_traces({"a3"}, {"a8"}))
+
+        loaded[("[>", "a9", "[]")] = 2
+        assert loaded.follows()[("a9", "[]")] == 2
+
+    def test_pickle_load_binary(self, tmp_path):
+        import pickle
+
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"))
+        filepath = str(tmp_path / "L1.skvlog")
+        tl.save_binary(filepath)
+
+        copied = pickle.loads(pickle.dumps(TraceLog.load_binary(filepath)))
+        assert dict(copied) == dict(tl)
+        assert copied.activity_names == tl.activity_names
+        assert dict(copied.filter_traces({"a3"})) == dict(tl.filter_traces({"a3"}))
+        assert all(isinstance(variant, array) for variant, _ in copied.encoded_variants())
+
+        view = pickle.loads(pickle.dumps(TraceLog.load_binary(filepath).filter_traces({"a3"})))
+        assert dict(view) == dict(tl.filter_traces({"a3"}))
+
+    def test_load_binary_invalid_file(self):
+        with pytest.raises(IllegalLogAction):
+            TraceLog.load_binary(os.path.join(DATA, "L1.txt"))
+
+    def test_cache(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+
+        aa = tl.always_after()
+        assert tl.always_after() == aa
+        assert tl.cache_info() == {"hits": 1, "misses": 1, "size": 1}
+
+        # Results are copies, modifying them leaves the cache intact
+        aa.clear()
+        assert tl.always_after() != aa
+
+        f1 = tl.follows()
+        assert tl.follows(1) == f1
+        assert tl.follows(distance=1) == f1
+        assert tl.cache_info()["hits"] == 4
+
+        tl[("[>", "a1", "a9", "[]")] = 1
+        assert tl.cache_info()["size"] == 0
+        assert ("a1", "a9") in tl.follows()
+        assert ("a9", "[]") in tl.always_after()
+
+        del tl[("[>", "a1", "a9", "[]")]
+        assert ("a1", "a9") not in tl.follows()
+
+    def test_cache_lru(self):
+        tl = TraceLog({tuple("abcdefgh"): 1})
+        tl.cache_size = 3
+
+        for distance in range(1, 6):
+            tl.follows(distance)
+        assert tl.cache_info()["size"] == 3
+
+        tl.follows(3)
+        tl.follows(1)
+        assert tl.cache_info()["hits"] == 1
+
+    def test_filter_traces_view(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        fl = tl.filter_traces({"a2", "a3"}, {"a7"})
+
+        target = {
+            k: v for k, v in tl.items()
+            if "a2" in k and "a3" in k and "a7" not in k
+        }
+        assert dict(fl) == target
+        assert len(fl) == len(target)
+        assert set(fl.labels) == set(a for k in target for a in k)
+
+        copy = TraceLog(target)
+        assert fl.never_together() == copy.never_together()
+        assert fl.always_after() == copy.always_after()
+        assert fl.always_before() == copy.always_before()
+        assert fl.statistics() == copy.statistics()
+        assert fl.min_counter() == copy.min_counter()
+
+        # Filtering a view further narrows its traces
+        ffl = fl.filter_traces(forbA={"a6"})
+        assert dict(ffl) == {k: v for k, v in target.items() if "a6" not in k}
+
+        with pytest.raises(IllegalLogAction):
+            fl[("[>", "a1", "[]")] = 1
+
+        # The view follows the changes of the log
+        key = next(iter(fl))
+        tl[key] += 10
+        assert fl[key] == target[key] + 10
+        assert fl.sum_counter()["a1"] == copy.sum_counter()["a1"] + 10
+        del tl[key]
+        assert key not in fl
+
+    def test_filter_traces_unknown_activity(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt"))
+
+        assert len(tl.filter_traces({"z"})) == 0
+        assert dict(tl.filter_traces(forbA={"z"})) == dict(tl)
+
+    def test_from_file(self, tmp_path):
+        txt = TraceLog.from_txt(os.path.join(DATA, "L2.txt"))
+        assert dict(TraceLog.from_file(os.path.join(DATA, "L2.txt"))) == dict(txt)
+
+        xes = TraceLog.from_xes(os.path.join(DATA, "L2.xes"))
+        assert dict(TraceLog.from_file(os.path.join(DATA, "L2.xes"))) == dict(xes)
+        assert dict(TraceLog.from_file(os.path.join(DATA, "L2.xes.gz"))) == dict(xes)
+
+        filepath = str(tmp_path / "L2.skvlog")
+        txt.save_binary(filepath)
+        assert dict(TraceLog.from_file(filepath)) == dict(txt)
+
+    def test_register_importer(self, tmp_path):
+        filepath = str(tmp_path / "L2.LOG")
+        with open(os.path.join(DATA, "L2.txt")) as src, open(filepath, "w") as dst:
+            dst.write(src.read().replace(" ", ";"))
+
+        register_importer(".log", "skelevision.objects:TraceLog.from_txt")
+        try:
+            tl = TraceLog.from_file(filepath, delimiter=";")
+        finally:
+            _IMPORTERS.pop()
+
+        assert dict(tl) == dict(TraceLog.from_txt(os.path.join(DATA, "L2.txt")))
+
+    def test_from_counts(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"))
+        expected = TraceLog()
+        for trace, freq in tl.items():
+            expected[trace] = freq
+
+        for counts in (dict(tl), Counter(dict(tl)), list(tl.items())):
+            bulk = TraceLog.from_counts(counts)
+            assert dict(bulk) == dict(expected)
+            assert list(bulk.labels) == list(expected.labels)
+            assert bulk.activity_names == expected.activity_names
+            assert bulk.follows() == expected.follows()
+            assert dict(bulk.filter_traces({"a3"})) == dict(expected.filter_traces({"a3"}))
+
+        assert dict(TraceLog.from_counts({("a",): 2.0})) == {("a",): 2}
+        assert len(TraceLog.from_counts([])) == 0
+
+    def test_from_counts_exceptions(self):
+        with pytest.raises(IllegalLogAction):
+            TraceLog.from_counts([(("a",), 1), (("a",), 2)])
+        with pytest.raises(IllegalLogAction):
+            TraceLog.from_counts({("a",): 1, ("b",): -1})
+        with pytest.raises(IllegalLogAction):
+            TraceLog.from_counts({("a",): 1.5})
+
+    @pytest.mark.parametrize(
+        "filename", ["L1.txt", "L1.txt.gz", "L1.txt.xz", "L1.xes", "L1.xes.gz", "L1.xes.xz"]
+    )
+    def test_save_to_file(self, tmp_path, filename):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"))
+        filepath = str(tmp_path / filename)
+        fmt = "xes" if ".xes" in filename else "txt"
+
+        assert tl.save_to_file(filepath, format=fmt, chunk_size=64)
+        assert dict(TraceLog.from_file(filepath)) == dict(tl)
+
+        # A filtered view is written as it is
+        view = tl.filter_traces({"a8"})
+        assert view.save_to_file(filepath, format=fmt)
+        assert dict(TraceLog.from_file(filepath)) == dict(view)
+
+    def test_save_to_file_exceptions(self, tmp_path):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"))
+        assert not TraceLog().save_to_file(str(tmp_path / "empty.txt"))
+        with pytest.raises(ValueError):
+            tl.save_to_file(str(tmp_path / "L1.csv"), format="csv")
+        with pytest.raises(ValueError):
+            tl.save_to_file(str(tmp_path / "L1.txt.bz2"), compression="bz2")
+
+    @staticmethod
+    def write_csv(log, filepath, sorted_by_case=True, header=True, delimiter=","):
+        """Writes a log as a CSV file of (case, activity, timestamp) rows, the
+        rows shuffled (but timestamped in order) unless sorted by case.
+        """
+        import csv
+        import gzip
+        import random
+
+        rows = list()
+        n = 0
+        for trace, freq in sorted(log.items()):
+            for _ in range(freq):
+                rows.extend(("c{}".format(n), a, "{:06d}".format(i)) for i, a in enumerate(trace))
+                n += 1
+        if not sorted_by_case:
+            random.Random(0).shuffle(rows)
+
+        opener = gzip.open if filepath.endswith(".gz") else open
+        with opener(filepath, "wt", newline="") as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            if header:
+                writer.writerow(["id", "event", "time"])
+            writer.writerows(rows)
+
+    def test_from_csv(self, tmp_path):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"))
+        filepath = str(tmp_path / "L1.csv")
+
+        self.write_csv(tl, filepath)
+        csv_tl = TraceLog.from_csv(filepath, case="id", activity="event", sorted_by_case=True)
+        assert dict(csv_tl) == dict(tl)
+        csv_tl = TraceLog.from_csv(filepath, case="id", activity="event", chunk_size=16)
+        assert dict(csv_tl) == dict(tl)
+        csv_tl = TraceLog.from_csv(filepath, case="id", activity="event", processes=2,
+                                   sorted_by_case=True)
+        assert dict(csv_tl) == dict(tl)
+
+        # Shuffled rows are ordered by timestamp
+        self.write_csv(tl, filepath, sorted_by_case=False, header=False, delimiter=";")
+        for processes in (None, 2):
+            csv_tl = TraceLog.from_csv(filepath, case=0, activity=1, timestamp=2, delimiter=";",
+                                       header=False, parse_timestamp=int, processes=processes)
+            assert dict(csv_tl) == dict(tl)
+
+        filepath = str(tmp_path / "L1.csv.gz")
+        self.write_csv(tl, filepath, sorted_by_case=False)
+        csv_tl = TraceLog.from_file(filepath, case="id", activity="event", timestamp="time")
+        assert dict(csv_tl) == dict(tl)
+
+    def test_from_csv_exceptions(self, tmp_path):
+        filepath = str(tmp_path / "L1.csv")
+        self.write_csv(TraceLog.from_txt(os.path.join(DATA, "L1.txt")), filepath)
+
+        with pytest.raises(IllegalLogAction):
+            TraceLog.from_csv(filepath)
+        with pytest.raises(IllegalLogAction):
+            TraceLog.from_csv(filepath, case="id", activity="event", timestamp="date")
+        with pytest.raises(IllegalLogAction):
+            TraceLog.from_csv(filepath, case="id", activity="event", header=False)
+
+    def test_follows_profile(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        profile = tl.follows_profile(4)
+
+        assert sorted(profile["distances"]) == [1, 2, 3, 4]
+        for distance, pairs in profile["distances"].items():
+            assert pairs == tl.follows(distance)
+
+        longest = max(len(trace) for trace in tl)
+        eventually = dict()
+        for distance in range(1, longest):
+            for pair, freq in tl.follows(distance).items():
+                eventually[pair] = eventually.get(pair, 0) + freq
+        assert profile["eventually"] == eventually
+
+        # The cached profile is not affected by changes to the returned one
+        profile["distances"][1].clear()
+        assert tl.follows_profile(4)["distances"][1] == tl.follows(1)
+
+    def test_follows_profile_dense(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt"))
+        profile = tl.follows_profile(2, dense=True, eventually=False)
+        names = tl.activity_names
+        assert profile["eventually"] is None
+
+        for distance, matrix in profile["distances"].items():
+            assert len(matrix) == len(names)
+            pairs = {
+                (names[a], names[b]): freq
+                for a, row in enumerate(matrix)
+                for b, freq in enumerate(row)
+                if freq
+            }
+            assert pairs == tl.follows(distance)
+
+    def test_follows_profile_exception(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt"))
+        with pytest.raises(ValueError):
+            tl.follows_profile(0)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from skelevision import LogSkeleton, TraceLog
+from skelevision.service import ConformanceService
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "datasets")
+
+
+async def exchange(reader, writer, requests):
+    writer.write(b"".join(json.dumps(r).encode("utf-8") + b"\n" for r in requests))
+    await writer.drain()
+    return [json.loads(await reader.readline()) for _ in requests]
+
+
+class TestConformanceService(object):
+    def run(self, tmp_path, unix):
+        l1 = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        l2 = TraceLog.from_txt(os.path.join(DATA, "L2.txt")).augment()
+        l2_path = str(tmp_path / "L2.skeleton")
+        LogSkeleton.save(LogSkeleton.mine(l2, {}, {}), l2_path)
+        trace = list(next(iter(l1)))
+
+        async def scenario():
+            service = ConformanceService(LogSkeleton.mine(l1, {}, {}))
+            if unix:
+                path = str(tmp_path / "service.sock")
+                server = await service.start(path=path)
+                reader, writer = await asyncio.open_unix_connection(path)
+            else:
+                server = await service.start()
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            responses = await exchange(reader, writer, [
+                {"id": 1, "trace": trace},
+                {"id": 2, "trace": ["[>", "a1", "[]"]},
+                {"trace": None},
+            ])
+            assert responses[0] == {"id": 1, "violations": 0, "details": []}
+            assert responses[1]["id"] == 2 and responses[1]["violations"] > 0
+            assert "error" in responses[2]
+
+            # Hot swap the skeleton on the same connection
+            responses = await exchange(reader, writer, [
+                {"command": "reload", "path": l2_path},
+                {"id": 3, "trace": trace},
+                {"id": 4, "trace": list(next(iter(l2)))},
+            ])
+            assert responses[0] == {"reloaded": l2_path}
+            assert responses[1]["violations"] > 0
+            assert responses[2] == {"id": 4, "violations": 0, "details": []}
+
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(scenario())
+
+    def test_tcp(self, tmp_path):
+        self.run(tmp_path, unix=False)
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires Unix sockets")
+    def test_unix(self, tmp_path):
+        self.run(tmp_path, unix=True)
+
+    def test_overlong_line(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        trace = list(next(iter(tl)))
+
+        async def scenario():
+            service = ConformanceService(LogSkeleton.mine(tl, {}, {}), limit=1024)
+            server = await service.start()
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            # The overlong line is answered, the connection still served
+            responses = await exchange(reader, writer, [
+                {"id": 1, "trace": ["a1"] * 2000},
+                {"id": 2, "trace": trace},
+            ])
+            assert "longer than 1024 bytes" in responses[0]["error"]
+            assert responses[1] == {"id": 2, "violations": 0, "details": []}
+
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(scenario())
+
+    def test_backpressure_and_reset(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt")).augment()
+        request = json.dumps({"id": 1, "trace": list(next(iter(tl)))}).encode("utf-8") + b"\n"
+
+        async def scenario():
+            errors = list()
+            asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx))
+            service = ConformanceService(LogSkeleton.mine(tl, {}, {}), batch_size=4)
+            server = await service.start()
+            port = server.sockets[0].getsockname()[1]
+
+            # Requests are sent without reading any response, then the
+            # connection is reset
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.transport.set_write_buffer_limits(high=1 << 24)
+            writer.write(request * 100000)
+            await asyncio.sleep(0.2)
+            writer.transport.abort()
+            await asyncio.sleep(0.2)
+
+            # The service still answers new connections
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = await exchange(reader, writer, [{"id": 2, "trace": ["a1"]}])
+            assert responses[0]["id"] == 2
+
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            assert errors == []
+
+        asyncio.run(scenario())
@@ -0,0 +1,99 @@
+import datetime
+import os
+import random
+
+from skelevision import EventStreamBuilder, TraceLog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "datasets")
+
+
+def interleave(log, seed=0):
+    """Returns the events of the cases of a log, randomly interleaved."""
+    rng = random.Random(seed)
+    cases = list()
+    for trace, freq in log.items():
+        for _ in range(freq):
+            cases.append(list(trace))
+
+    events = list()
+    open_cases = list(range(len(cases)))
+    while open_cases:
+        i = rng.randrange(len(open_cases))
+        case = open_cases[i]
+        events.append((case, cases[case].pop(0), len(events)))
+        if not cases[case]:
+            open_cases.pop(i)
+
+    return events
+
+
+class TestEventStreamBuilder(object):
+    def test_end_marker(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L2.txt")).augment()
+        builder = EventStreamBuilder(end="[]")
+        builder.update(interleave(tl))
+
+        assert len(builder.open_cases) == 0
+        assert builder.open_events == 0
+        assert builder.closed["end"] == sum(tl.values())
+        assert dict(builder.to_log()) == dict(tl)
+
+    def test_flush(self):
+        tl = TraceLog.from_txt(os.path.join(DATA, "L1.txt"))
+        builder = EventStreamBuilder().update(interleave(tl))
+
+        assert len(builder.open_cases) == sum(tl.values())
+        assert dict(builder.to_log(flush=False)) == {}
+        assert dict(builder.to_log()) == dict(tl)
+        assert builder.closed["flushed"] == sum(tl.values())
+
+    def test_timeout(self):
+        closed = list()
+        start = datetime.datetime(2020, 1, 1)
+        builder = EventStreamBuilder(
+            timeout=datetime.timedelta(minutes=10),
+            on_close=lambda case, trace, reason: closed.append((case, trace, reason)),
+        )
+        minute = datetime.timedelta(minutes=1)
+        builder.update([
+            ("c1", "a", start),
+            ("c2", "a", start + minute),
+            ("c1", "b", start + 2 * minute),
+            ("c2", "b", start + 5 * minute),
+            ("c3", "a", start + 13 * minute),
+        ])
+
+        assert closed == [("c1", ("a", "b"), "timeout")]
+        builder.expire(start + 20 * minute)
+        assert closed[-1] == ("c2", ("a", "b"), "timeout")
+        assert list(builder.open_cases) == ["c3"]
+        assert builder.to_log(flush=False) == {("a", "b"): 2}
+
+    def test_timeout_untimestamped_case(self):
+        builder = EventStreamBuilder(timeout=10)
+        builder.update([("x", "a", None), ("c1", "a", 0), ("c2", "a", 100)])
+
+        # The case without timestamps neither times out nor holds back the others
+        assert list(builder.open_cases) == ["x", "c2"]
+        assert builder.closed["timeout"] == 1
+
+        builder.add("x", "b", 105)
+        builder.expire(200)
+        assert list(builder.open_cases) == []
+        assert builder.to_log() == {("a",): 2, ("a", "b"): 1}
+
+    def test_eviction(self):
+        builder = EventStreamBuilder(max_open_cases=2)
+        builder.update([(1, "a", None), (2, "a", None), (1, "b", None), (3, "a", None)])
+
+        # Case 2 is the least recently active one
+        assert list(builder.open_cases) == [1, 3]
+        assert builder.closed["evicted"] == 1
+        assert builder.counts == {("a",): 1}
+
+        builder = EventStreamBuilder(max_open_events=3, fold_evicted=False)
+        builder.update([(1, "a", 0), (1, "b", 1), (2, "a", 2), (2, "b", 3)])
+        assert list(builder.open_cases) == [2]
+        assert builder.open_events == 2
+        assert builder.counts == {}
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from skelevision import TraceLog, VariantTrie
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "datasets")
+
+
+@pytest.fixture(params=["L1.txt", "L2.txt", "L4.txt"])
+def log(request):
+    return TraceLog.from_txt(os.path.join(DATA, request.param)).augment()
+
+
+class TestVariantTrie(object):
+    def test_matches_tracelog(self, log):
+        trie = log.to_trie()
+
+        for distance in (1, 2, 3):
+            assert trie.follows(distance) == log.follows(distance)
+        assert trie.sum_counter() == log.sum_counter()
+        assert trie.statistics() == log.statistics()
+        assert list(trie.statistics()) == list(log.statistics())
+        assert trie.always_after() == log.always_after()
+        assert trie.always_before() == log.always_before()
+
+    def test_filtered_view(self, log):
+        view = log.filter_traces(forbA={"a2", "b"})
+        trie = view.to_trie()
+
+        assert trie.follows() == view.follows()
+        assert trie.statistics() == view.statistics()
+        assert trie.always_after() == view.always_after()
+        assert trie.always_before() == view.always_before()
+
+    def test_shared_prefixes(self, log):
+        trie = log.to_trie()
+
+        assert trie.n_variants == len(log)
+        assert len(trie) - 1 < sum(len(t) for t in log)
+        decoded = {log.decode(v): f for v, f in trie.variants()}
+        assert decoded == dict(log)
+
+    def test_prefix_variants(self):
+        tl = TraceLog({("a", "b"): 2, ("a", "b", "a", "c"): 1, ("a",): 3, (): 1})
+        trie = VariantTrie.from_log(tl)
+
+        assert len(trie) == 5
+        assert trie.n_variants == 4
+        assert trie.follows() == {("a", "b"): 3, ("b", "a"): 1, ("a", "c"): 1}
+        assert trie.sum_counter() == {"a": 7, "b": 3, "c": 1}
+        assert trie.statistics() == {
+            "a": {"sum": 7, "min": 0, "max": 2},
+            "b": {"sum": 3, "min": 0, "max": 1},
+            "c": {"sum": 1, "min": 0, "max": 1},
+        }
+        assert trie.always_after() == tl.always_after()
+        assert trie.always_before() == tl.always_before()
+
+    def test_zero_frequency(self):
+        tl = TraceLog({("a", "b"): 0})
+        trie = tl.to_trie()
+
+        assert trie.statistics() == tl.statistics()
+        assert trie.always_after() == tl.always_after()
+        assert [(tl.decode(v), f) for v, f in trie.variants()] == [(("a", "b"), 0)]
+
+        trie.add(tl.encode(("a", "b")), 0)
+        assert trie.n_variants == 1
+
+    def test_follows_distance(self, log):
+        trie = log.to_trie()
+
+        assert trie.follows(2.0) == log.follows(2)
+        with pytest.raises(ValueError):
+            trie.follows(0)
+        with pytest.raises(ValueError):
+            trie.follows(1.5)
@@ -2,7 +2,13 @@ import os
 
 import pytest
 
-from skelevision import follows, successors, predecessors
+from skelevision import (
+    fast_predecessors,
+    fast_successors,
+    follows,
+    predecessors,
+    successors,
+)
 
 from sortedcontainers import SortedSet
 
@@ -103,3 +109,24 @@ def test_predecessor():
         "a4": SortedSet({"a1", "a2"}),
     }
     assert predecessors(t1) == target
+
+def test_fast_successors():
+    t1 = ("a1","a2","a4","a5","a6","a2")
+    assert fast_successors(t1) == successors(t1)
+
+    t2 = ("a1","a2","a4","a1","a5","a4","a2", "a2")
+    assert fast_successors(t2) == successors(t2)
+
+def test_fast_predecessors():
+    t1 = ("a1","a2","a4","a5","a6","a2")
+    assert fast_predecessors(t1) == predecessors(t1)
+
+    t2 = ("a1","a2","a4","a1","a5","a4","a2", "a2")
+    assert fast_predecessors(t2) == predecessors(t2)
+
+
+def test_package_namespace():
+    import skelevision
+
+    for name in ("Counter", "add", "chain", "islice", "repeat", "SortedSet", "combinations"):
+        assert not hasattr(skelevision, name)